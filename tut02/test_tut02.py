@@ -0,0 +1,80 @@
+import os
+import sys
+
+import pytest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+
+from tut02 import (INPUT_COLUMNS, OCTANT_CODES, octant_classify, octant_classify_reference, octant_index,
+    octant_transition_matrix, read_octant_input, write_columnar)
+
+
+def random_deviations(rows,seed):
+    #Random U, V and W deviations, with some exact zeros and NaNs in every column
+    #A zero or a NaN is not >0, so it falls in the same octant as a negative value
+    rng=np.random.default_rng(seed)
+    columns={}
+    for name in ['U-u_avg','V-v_avg','W-w_avg']:
+        values=rng.normal(size=rows)
+        values[rng.random(rows)<0.1]=0.0
+        values[rng.random(rows)<0.05]=np.nan
+        columns[name]=values
+    return pd.DataFrame(columns)
+
+
+def test_octant_classify_matches_reference():
+    for seed in range(5):
+        data=random_deviations(2000,seed)
+        octants=octant_classify(data['U-u_avg'],data['V-v_avg'],data['W-w_avg'])
+        assert octants.dtype==np.int8
+        assert np.array_equal(octants,octant_classify_reference(data))
+
+
+def test_octant_classify_every_octant():
+    #One row per octant, plus the all zero and all NaN rows
+    data=pd.DataFrame({
+        'U-u_avg':[1,1,-1,-1,-1,-1,1,1,0,np.nan],
+        'V-v_avg':[1,1,1,1,-1,-1,-1,-1,0,np.nan],
+        'W-w_avg':[1,-1,1,-1,1,-1,1,-1,0,np.nan],
+    })
+    expected=[1,-1,2,-2,3,-3,4,-4,-3,-3]
+    assert octant_classify(data['U-u_avg'],data['V-v_avg'],data['W-w_avg']).tolist()==expected
+    assert octant_classify_reference(data).tolist()==expected
+
+
+def test_octant_transition_matrix_matches_loop():
+    #The transition from row i to row i+1 is counted in the mod range of row i
+    #A mod value far above the number of rows gives a single range without allocating mod entries
+    rng=np.random.default_rng(0)
+    for rows,mod in [(1,5),(10,3),(1000,7),(1000,1000),(10,10**9)]:
+        octants=rng.choice(OCTANT_CODES,size=rows)
+        index=octant_index(octants)
+        expected=np.zeros(((rows-1)//mod+1,8,8),dtype=np.intp)
+        for i in range(rows-1):
+            expected[i//mod,index[i],index[i+1]]+=1
+        assert np.array_equal(octant_transition_matrix(octants,mod),expected)
+
+
+def test_columnar_input_checks_its_schema(tmp_path):
+    columns={name:np.zeros(4) for name in INPUT_COLUMNS}
+    columns["Octant"]=np.ones(4,dtype=np.int8)
+    good=str(tmp_path/"good.octc")
+    write_columnar(good,columns)
+    data,octants=read_octant_input(good)
+    assert list(data.columns)==INPUT_COLUMNS and octants.tolist()==[1,1,1,1]
+
+    #a file without one of the deviation columns, e.g. the T, U, V, W columns of tut07
+    del columns["W-w_avg"]
+    missing=str(tmp_path/"missing.octc")
+    write_columnar(missing,columns)
+    with pytest.raises(ValueError,match="W-w_avg"):
+        read_octant_input(missing)
+
+    #a file made by tut07, which has another magic
+    with open(good,"r+b") as file:
+        file.write(b"OC07")
+    with pytest.raises(ValueError,match="not a columnar octant file of tut02"):
+        read_octant_input(good)
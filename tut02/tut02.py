@@ -1,9 +1,410 @@
-def octant_transition_count(mod=5000):
+import hashlib
+import json
+import os
+import struct
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+
+#The eight octant codes, in the order in which they are written in the excel sheet
+OCTANT_CODES=np.array([1,-1,2,-2,3,-3,4,-4],dtype=np.int8)
+OCTANT_LABELS=np.array(["+1","-1","+2","-2","+3","-3","+4","-4"],dtype=object)
+
+#Columns of the report written to the right of the input in the excel sheet
+REPORT_COLUMNS=["","Octant ID"]+list(OCTANT_LABELS)
+
+#Octant code for every combination of the sign bits (u>0)<<2 | (v>0)<<1 | (w>0)
+#Bit pattern 0b110 for example means u>0, v>0, w<=0 which is octant -1
+SIGN_BITS_TO_OCTANT=np.array([-3,3,-2,2,-4,4,-1,1],dtype=np.int8)
+
+
+def octant_classify(u,v,w):
+    #Vectorized octant classification. The sign bits of the whole U, V and W columns are computed
+    #as arrays and mapped to the octant codes with a single table lookup. Returns an int8 array
+    u=np.asarray(u)
+    v=np.asarray(v)
+    w=np.asarray(w)
+    bits=((u>0).astype(np.intp)<<2)|((v>0).astype(np.intp)<<1)|(w>0).astype(np.intp)
+    return SIGN_BITS_TO_OCTANT[bits]
+
+
+def octant_classify_reference(data):
+    #Row by row octant classification, the way it was originally done in octant_transition_count
+    #It is slow and is only kept as a reference to compare the output of octant_classify against
+    lastval=data.index[-1]
+    octants=np.zeros(lastval+1,dtype=np.int8)
+    for i in range(0,lastval+1,1):
+        u=data['U-u_avg'][i]
+        v=data['V-v_avg'][i]
+        w=data['W-w_avg'][i]
+        if u>0:
+            if v>0:
+                if w>0:
+                    octants[i]=1
+                else:
+                    octants[i]=-1
+            else:
+                if w>0:
+                    octants[i]=4
+                else:
+                    octants[i]=-4
+        else:
+            if v>0:
+                if w>0:
+                    octants[i]=2
+                else:
+                    octants[i]=-2
+            else:
+                if w>0:
+                    octants[i]=3
+                else:
+                    octants[i]=-3
+    return octants
+
+
+def octant_index(octants):
+    #Position (0 to 7) of each octant code in OCTANT_CODES, i.e. +1->0, -1->1, +2->2 ... -4->7
+    octants=np.asarray(octants)
+    return (2*(np.abs(octants)-1)+(octants<0)).astype(np.intp)
+
+
+def octant_transition_matrix(octants,mod):
+    #Counts the octant transitions (i -> i+1) of every mod range at once
+    #Each consecutive pair is encoded as from*8+to and offset by 64 times the mod range of its "from" value,
+    #so that a single bincount gives all the 8x8 tables. Memory grows with the rows, not with the mod value
+    #A transition belongs to the mod range of its "from" value, so the last transition of a range
+    #crosses over into the next range, exactly as in the original row by row count
+    #Returns an (n_windows,8,8) integer array, n_windows being lastval//mod+1
+    index=octant_index(octants)
+    n_windows=(len(index)-1)//mod+1
+    windows=np.arange(len(index)-1,dtype=np.intp)//mod
+    counts=np.bincount(windows*64+index[:-1]*8+index[1:],minlength=64*n_windows)
+    return counts.reshape(n_windows,8,8)
+
+
+def octant_window_starts(n,size,stride):
+    #First rows of the sliding windows of "size" rows, one every "stride" rows, over an input of n rows
+    #Only whole windows are taken, an input shorter than one window gives a single shorter window
+    if(size<1 or stride<1):
+        raise ValueError("window size and stride must be positive")
+    return np.arange(0,max(n-size,0)+1,stride,dtype=np.intp)
+
+
+def octant_prefix_counts(values,positions,nbins):
+    #Counts of every bin (0 to nbins-1) in values[:p] for every p of the sorted, unique array "positions"
+    #The prefix counts are only kept at these positions: the rows are split into the segments between
+    #consecutive positions, a single bincount counts every segment and a cumsum adds the segments up
+    #Returns a (len(positions),nbins) integer array
+    edges=np.clip(positions,0,len(values))
+    segments=np.repeat(np.arange(len(edges)+1,dtype=np.intp),np.diff(np.concatenate(([0],edges,[len(values)]))))
+    counts=np.bincount(segments*nbins+values,minlength=(len(edges)+1)*nbins).reshape(-1,nbins)
+    return np.cumsum(counts[:len(edges)],axis=0)
+
+
+def octant_sliding_windows(octants,size,stride=1):
+    #Octant counts and transition counts of overlapping windows of "size" rows starting every "stride" rows
+    #Every window is the difference of the prefix counts at its two edges, so the cost does not grow
+    #with the overlap of the windows. As for the mod ranges a transition belongs to the window of its
+    #"from" row, so a window with stride=size is exactly a mod range of octant_transition_matrix
+    #Returns (starts, counts, transitions): the first row of every window, an (n_windows,8) and an
+    #(n_windows,8,8) integer array
+    index=octant_index(octants)
+    n=len(index)
+    starts=octant_window_starts(n,size,stride)
+    ends=np.minimum(starts+size,n)
+    edges=np.unique(np.concatenate((starts,ends)))
+    first=np.searchsorted(edges,starts)
+    last=np.searchsorted(edges,ends)
+    prefix=octant_prefix_counts(index,edges,8)
+    counts=prefix[last]-prefix[first]
+    prefix=octant_prefix_counts(index[:-1]*8+index[1:],edges,64)
+    transitions=(prefix[last]-prefix[first]).reshape(-1,8,8)
+    return starts,counts,transitions
+
+
+def write_sliding_windows(filename,starts,size,n,counts,transitions):
+    #Writes one line per sliding window to a csv file: its first and last row, the octant counts and the
+    #64 transition counts ("+1>-1" is the count of transitions from +1 to -1)
+    labels=[str(label) for label in OCTANT_LABELS]
+    header=["Start","End"]+labels+[a+">"+b for a in labels for b in labels]
+    table=np.column_stack((starts,np.minimum(starts+size,n)-1,counts,transitions.reshape(len(starts),64)))
+    np.savetxt(filename,table,fmt="%d",delimiter=",",header=",".join(header),comments="")
+
+
+def octant_labels(octants):
+    #Converts the int8 octant codes to the "+1","-1",... labels used in the excel sheet
+    return OCTANT_LABELS[octant_index(octants)]
+
+
+#Results of the octant analysis, kept as typed arrays and separate from the layout of the excel sheet
+#mod            - the mod value used
+#lastval        - index of the last row of the input, when index starts from 0
+#counts         - (8,) overall count of every octant, in the order of OCTANT_CODES
+#windowcounts   - (n_windows,8) octant counts of every mod range
+#transitions    - (n_windows,8,8) transition counts of every mod range, rows are "from" and columns "to"
+OctantTransitionResult=namedtuple("OctantTransitionResult",["mod","lastval","counts","windowcounts","transitions"])
+
+
+def octant_window_counts(octants,mod):
+    #Octant counts of every mod range with a single bincount, the same way as octant_transition_matrix
+    #Returns an (n_windows,8) integer array
+    index=octant_index(octants)
+    n_windows=(len(index)-1)//mod+1
+    windows=np.arange(len(index),dtype=np.intp)//mod
+    return np.bincount(windows*8+index,minlength=n_windows*8).reshape(n_windows,8)
+
+
+def octant_transition_result(octants,mod):
+    #Calculates all the counts of the octant analysis from the octant codes
+    windowcounts=octant_window_counts(octants,mod)
+    return OctantTransitionResult(mod,len(octants)-1,windowcounts.sum(axis=0),windowcounts,octant_transition_matrix(octants,mod))
+
+
+def octant_transition_sweep(octants,mods):
+    #OctantTransitionResult of several mod values in one pass
+    #The prefix counts of the octants and of the transitions are taken once, at the edges of the mod
+    #ranges of all the mod values together (see octant_prefix_counts), and every mod range of every
+    #mod value is the difference of two prefix rows
+    #Returns a list of results in the order of mods, the same as octant_transition_result for each mod
+    index=octant_index(octants)
+    n=len(index)
+    edges=np.unique(np.concatenate([np.arange(0,n,mod,dtype=np.intp) for mod in mods]+[[n]]))
+    counts=octant_prefix_counts(index,edges,8)
+    pairs=octant_prefix_counts(index[:-1]*8+index[1:],edges,64)
+    results=[]
+    for mod in mods:
+        starts=np.arange(0,n,mod,dtype=np.intp)
+        first=np.searchsorted(edges,starts)
+        last=np.searchsorted(edges,np.minimum(starts+mod,n))
+        windowcounts=counts[last]-counts[first]
+        transitions=(pairs[last]-pairs[first]).reshape(-1,8,8)
+        results.append(OctantTransitionResult(mod,n-1,windowcounts.sum(axis=0),windowcounts,transitions))
+    return results
+
+
+def octant_range_label(mod,k,lastval):
+    #Label of the k-th mod range (k starts from 0) as written in the excel sheet
+    if(k==0):
+        return "0000"+"-"+str(mod-1)
+    if(mod*(k+1)-1<lastval):
+        return str(mod*k)+"-"+str(mod*(k+1)-1)
+    return str(mod*k)+"-"+str(lastval)
+
+
+def octant_transition_report(result):
+    #Lays out the results in the same grid of cells as the excel sheet of the tutorial
+    #The grid is a list of rows with one entry per column of REPORT_COLUMNS, empty cells are ""
+    #Its size only depends on the number of mod ranges and not on the length of the input
+    mod=result.mod
+    multiply=result.lastval//mod   #quotient when the last index is divided by mod, one less than the number of mod ranges
+    column={name:position for position,name in enumerate(REPORT_COLUMNS)}
+    values=list(OCTANT_LABELS)
+    grid=[[""]*len(REPORT_COLUMNS) for i in range(13*(multiply+1)+multiply+18)]
+
+    ##############################
+    #Overall count and the count of every mod range
+    grid[1][column[""]]="User Input"
+    grid[0][column["Octant ID"]]="Overall Count"
+    grid[1][column["Octant ID"]]="Mod "+str(mod)
+    for j in range(0,8,1):
+        grid[0][column[values[j]]]=int(result.counts[j])
+    for k in range(0,multiply+1,1):
+        grid[k+2][column["Octant ID"]]=octant_range_label(mod,k,result.lastval)
+        for j in range(0,8,1):
+            grid[k+2][column[values[j]]]=int(result.windowcounts[k,j])
+
+    #For the final verification of overall counts after individually adding the counts in each mod range
+    grid[1+multiply+2][column["Octant ID"]]="Verified"
+    verified=result.windowcounts.sum(axis=0)
+    for j in range(0,8,1):
+        grid[1+multiply+2][column[values[j]]]=int(verified[j])
+    ##############################
+
+    #################################
+    #This is the overall transition count, cells without any transition are left empty
+    #"fromposition" is the row of the octant in the grid
+    overalltransitions=result.transitions.sum(axis=0)
+    grid[1+(multiply+1)+4][column["Octant ID"]]="Overall Transition Count"
+    grid[1+(multiply+1)+4+1][column["+1"]]="To"
+    grid[1+(multiply+1)+4+2][column["Octant ID"]]="Count"
+    grid[1+(multiply+1)+4+3][column[""]]="From"
+    for j in range(0,8,1):
+        grid[1+(multiply+1)+6][column[values[j]]]=values[j]
+    for i in range(0,8,1):
+        fromposition=(multiply+1)+1+7+i
+        grid[fromposition][column["Octant ID"]]=values[i]
+        for j in range(0,8,1):
+            if(overalltransitions[i,j]):
+                grid[fromposition][column[values[j]]]=int(overalltransitions[i,j])
+    ##################################
+
+    ##########################################
+    #The transition count of every mod range, one table every 13 rows
+    for k in range(1,multiply+2,1):
+        grid[1+(multiply+1)+5+(13*k)][column["Octant ID"]]="Mod Transition Count"
+        grid[1+(multiply+1)+6+(13*k)][column["+1"]]="To"
+        grid[1+(multiply+1)+6+(13*k)][column["Octant ID"]]=octant_range_label(mod,k-1,result.lastval)
+        grid[1+(multiply+1)+7+(13*k)][column["Octant ID"]]="Count"
+        grid[1+(multiply+1)+8+(13*k)][column[""]]="From"
+        for j in range(0,8,1):
+            grid[1+(multiply+1)+7+(13*k)][column[values[j]]]=values[j]
+        for i in range(0,8,1):
+            fromposition=1+multiply+1+8+(13*k)+i
+            grid[fromposition][column["Octant ID"]]=values[i]
+            for j in range(0,8,1):
+                grid[fromposition][column[values[j]]]=int(result.transitions[k-1,i,j])
+    ##########################################
+    return grid
+
+
+def write_octant_transition_report(result,filename,data=None):
+    #Writes the results to an excel file. If the input DataFrame "data" is given (with its Octant column)
+    #it is written first and the report is written to the columns right of it, as in the tutorial
+    #Only the small report grid is built here, the input DataFrame is never used to hold the report
     import pandas as pd
+    with pd.ExcelWriter(filename) as writer:
+        write_octant_transition_sheet(writer,"Sheet1",result,data)
+
+
+def write_octant_transition_sweep(results,filename,data=None):
+    #Writes the results of several mod values to one excel file, one sheet "Mod <mod>" per result
+    import pandas as pd
+    with pd.ExcelWriter(filename) as writer:
+        for result in results:
+            write_octant_transition_sheet(writer,"Mod "+str(result.mod),result,data)
+
+
+def write_octant_transition_sheet(writer,sheetname,result,data=None):
+    #Writes the input (if given) and the report of one result to a sheet of a pandas ExcelWriter
+    import pandas as pd
+    report=pd.DataFrame(octant_transition_report(result),columns=REPORT_COLUMNS)
+    startcol=0
+    if(data is not None):
+        data.to_excel(writer,sheet_name=sheetname,index=False)
+        startcol=len(data.columns)
+    report.to_excel(writer,sheet_name=sheetname,index=False,startcol=startcol)
+
+
+#Memory-mapped columnar file made by "python tut02.py ingest", see write_columnar
+#Layout: a 24 byte header (magic, version, number of rows, length of the column table), the column
+#table as JSON (name, dtype and byte offset of every column) and then the columns one after the other,
+#each one starting at a multiple of 64 bytes
+#The magic differs between tut02 and tut07, their files hold different columns (here the U, V and W deviations)
+#and octants classified with different rules, so a file of one tool is refused by the other
+COLUMNAR_MAGIC=b"OC02"
+COLUMNAR_VERSION=1
+COLUMNAR_HEADER=struct.Struct("<4sIQQ")
+
+
+def write_columnar(filename,columns):
+    #Writes a dict of equally long 1-D arrays to filename in the columnar format
+    nrows=len(next(iter(columns.values())))
+    table=[]
+    offset=0
+    for name,array in columns.items():
+        table.append({"name":name,"dtype":array.dtype.str,"offset":offset})
+        offset+=-(-array.nbytes//64)*64
+    tablebytes=json.dumps(table).encode()
+    start=-(-(COLUMNAR_HEADER.size+len(tablebytes))//64)*64
+    with open(filename,"wb") as file:
+        file.write(COLUMNAR_HEADER.pack(COLUMNAR_MAGIC,COLUMNAR_VERSION,nrows,len(tablebytes)))
+        file.write(tablebytes)
+        for entry,array in zip(table,columns.values()):
+            file.seek(start+entry["offset"])
+            file.write(np.ascontiguousarray(array).tobytes())
+        file.truncate(start+offset)
+
+
+def read_columnar(filename):
+    #Opens a file written by write_columnar. Returns a dict of read-only np.memmap columns, nothing is
+    #read from the disk until the data is used and the pages are shared by all processes using the file
+    with open(filename,"rb") as file:
+        magic,version,nrows,tablelength=COLUMNAR_HEADER.unpack(file.read(COLUMNAR_HEADER.size))
+        if(magic!=COLUMNAR_MAGIC or version!=COLUMNAR_VERSION):
+            raise ValueError(filename+" is not a columnar octant file of tut02, ingest the workbook again with tut02")
+        table=json.loads(file.read(tablelength))
+    start=-(-(COLUMNAR_HEADER.size+tablelength)//64)*64
+    columns={}
+    for entry in table:
+        if(nrows==0):
+            columns[entry["name"]]=np.zeros(0,dtype=entry["dtype"])
+        else:
+            columns[entry["name"]]=np.memmap(filename,dtype=entry["dtype"],mode="r",offset=start+entry["offset"],shape=(nrows,))
+    return columns
+
+
+#Folder of the cache of parsed input files, see read_octant_input. It can be deleted at any time
+#tut02 and tut07 may share the folder, the name of the tool is part of the name of every cache file
+CACHE_DIR=".octant_cache"
+#Version of the cached data, to be increased whenever the parsing or the octant classification changes
+CACHE_VERSION=1
+
+
+def file_hash(filename):
+    #SHA-256 of the contents of the file, read in blocks of 1 MB
+    digest=hashlib.sha256()
+    with open(filename,"rb") as file:
+        for block in iter(lambda: file.read(1<<20),b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_octant_input(filename,cache=True):
+    #Reads the input file and classifies the octants of all its rows. Returns (data, octants)
+    #The parsed columns and the octant array are cached in CACHE_DIR as an .npz file named after the
+    #SHA-256 of the file contents. Running again on the same file, with the same or another mod value,
+    #skips both the excel parsing and the classification. A changed file has a different hash and is
+    #parsed again. The octants do not depend on the mod value, so it is not part of the key
+    #Files made by ingest_octant_input (.octc) are opened directly with their stored octants
+    import pandas as pd
+    if(filename.endswith(".octc")):
+        columns=read_columnar(filename)
+        missing=[name for name in INPUT_COLUMNS+["Octant"] if name not in columns]
+        if(missing):
+            raise ValueError(filename+" has no "+", ".join(missing)+" column")
+        octants=columns.pop("Octant")
+        return pd.DataFrame(columns),octants
+    if(cache):
+        cachefile=os.path.join(CACHE_DIR,file_hash(filename)+".tut02.v"+str(CACHE_VERSION)+".npz")
+        if(os.path.exists(cachefile)):
+            with np.load(cachefile,allow_pickle=False) as cached:
+                data=pd.DataFrame({name:cached["column"+str(i)] for i,name in enumerate(cached["columns"])})
+                return data,cached["octants"]
+    data=pd.read_excel(filename)
+    octants=octant_classify(data['U-u_avg'].to_numpy(),data['V-v_avg'].to_numpy(),data['W-w_avg'].to_numpy())
+    #only numeric columns can be stored without pickling, other inputs are simply not cached
+    if(cache and all(data[name].dtype.kind in "biuf" for name in data.columns)):
+        os.makedirs(CACHE_DIR,exist_ok=True)
+        arrays={"column"+str(i):data[name].to_numpy() for i,name in enumerate(data.columns)}
+        #written to a temporary file first so that a reader never sees a half written cache
+        temporary=cachefile+"."+str(os.getpid())+".tmp"
+        with open(temporary,"wb") as file:
+            np.savez(file,columns=np.array(data.columns,dtype=str),octants=octants,**arrays)
+        os.replace(temporary,cachefile)
+    return data,octants
+
+
+def ingest_octant_input(filename,outputfile=None,dtype=np.float64):
+    #Converts an input workbook once to the columnar format: the U, V and W deviation columns as float64
+    #(or float32) and the octants as an int8 column. The analysis then reads the .octc file with np.memmap
+    #instead of parsing the workbook again
+    #Returns the name of the written file, by default the workbook name with the .octc extension
+    data,octants=read_octant_input(filename,cache=False)
+    if(outputfile is None):
+        outputfile=os.path.splitext(filename)[0]+".octc"
+    columns={name:data[name].to_numpy(dtype) for name in INPUT_COLUMNS}
+    columns["Octant"]=np.asarray(octants,dtype=np.int8)
+    write_columnar(outputfile,columns)
+    return outputfile
+
+
+def octant_transition_count(mod=5000,cache=True,filename="input_octant_transition_identify.xlsx"):
     try:
         mod=mod+5                    #to check if entered mod value is an integer or not
         mod=mod-5
-        data=pd.read_excel("input_octant_transition_identify.xlsx")
+        data,octants=read_octant_input(filename,cache)
         a=mod+abs(mod)
         a=mod/a
     except FileNotFoundError:
@@ -13,262 +414,207 @@ def octant_transition_count(mod=5000):
     except ZeroDivisionError:
         print("Please enter a positive integral value of mod")    
     else:
-
-        ##############################
-        #Creating the columns in the excel sheet
-        data["Octant"]="" 
-        data[""]=""
-        data.at[1,""]="User Input"
-        data["Octant ID"]=""
-        data.at[0,"Octant ID"]="Overall Count"
-        data.at[1,"Octant ID"]="Mod "+str(mod)
-        data["+1"]=""
-        data["-1"]=""
-        data["+2"]=""
-        data["-2"]=""
-        data["+3"]=""
-        data["-3"]=""
-        data["+4"]=""
-        data["-4"]=""
-        ##############################
-
-
-        lastval=data.index[-1]  #To calculate the last index, when index starts from 0
-        multiply=lastval//mod   #To calculate quotient when the last index is divided by mod 
-
-
-
-        #################################
-        #This is the overall transition count
-        data.at[1+(multiply+1)+4,"Octant ID"]="Overall Transition Count"
-        data.at[1+(multiply+1)+4+2,"Octant ID"]="Count"
-        data.at[1+(multiply+1)+4+1,"+1"]="To"
-        data.at[1+(multiply+1)+4+3,""]="From"
-        listofvalues=["+1","-1","+2","-2","+3","-3","+4","-4"]
-        for i in range(1+(multiply+1)+7,1+(multiply+1)+15,1):
-            data.at[i,"Octant ID"]=listofvalues[i-(1+(multiply+1)+7)]
-        for j in range(0,8,1):
-            data.at[1+(multiply+1)+6,listofvalues[j]]=listofvalues[j]              
-        ##################################
-
-
-
-
-        #creating variables with inital value zero for doing the octant counts
-        count1=0
-        countm1=0
-        count2=0
-        countm2=0
-        count3=0
-        countm3=0
-        count4=0
-        countm4=0
-        ##########################
-
-
-
-        #creating a separate set of variables
-        #counterforeachoctant helps to iterate through the excel sheet cells column wise with a constant
-        #value for each mod range
-        #a,b,c,d,e,f,g,h help us store the value of the sum till the previous mod range. We subtract it from
-        #the cumulative octant count to get the octant count of the current mod range 
-        counterforeachoctant=2
-        a=0
-        b=0
-        c=0
-        d=0
-        e=0
-        f=0
-        g=0
-        h=0
-        for j in range(1,multiply+2,1):
-            if(j==1):
-                data.at[j+1,"Octant ID"]="0000"+"-"+str(mod-1)
-            else:
-                if(j<=multiply):
-                    num=str(mod*(j-1))+"-"+str(mod*j - 1)
-                    data.at[j+1,"Octant ID"]=num
-                else:
-                    num=str(mod*(j-1))+"-"+str(lastval)
-                    data.at[j+1,"Octant ID"]=num
-
-
-        ##############################################
-        #The following lines of code would check the numbers in the 3 columns and determine the octant values
-        #based on the conditional statements provided
-        #Calculating the octant value follows the same logic as described in the explanatory video
-        for i in range(0,lastval+1,1):
-            u=data['U-u_avg'][i]
-            v=data['V-v_avg'][i]
-            w=data['W-w_avg'][i]
-            if u>0:
-                if v>0:
-                    if w>0:
-                        
-                        data.at[i,'Octant']="+1"
-                    else:
-                        
-                        data.at[i,'Octant']="-1"
-                else:
-                    if w>0:
-                        
-                        data.at[i,'Octant']="+4"
-                    else:
-                        
-                        data.at[i,'Octant']="-4"
-            else:
-                if v>0:
-                    if w>0:
-                        data.at[i,'Octant']="+2"
-                    else:
-                        data.at[i,'Octant']="-2"
-                else:
-                    if w>0:
-                        data.at[i,'Octant']="+3"
-                    else: 
-                        data.at[i,'Octant']="-3" 
-
-            #Once the octant values are written down in the sheet, we simultaneously count the octant values
-            #The followin code describes counting the octant and also for counting in each mod range                                
-            if((data["Octant"][i])=="+1"):
-                count1+=1
-            elif((data["Octant"][i])=="-1"):
-                countm1+=1
-            elif((data["Octant"][i])=="+2"):
-                count2+=1
-            elif((data["Octant"][i])=="-2"):
-                countm2+=1   
-            elif((data["Octant"][i])=="+3"):
-                count3+=1
-            elif((data["Octant"][i])=="-3"):
-                countm3+=1
-            elif((data["Octant"][i])=="+4"):
-                count4+=1
-            elif((data["Octant"][i])=="-4"):
-                countm4+=1
-            if(((i!=0)and((i+1)%mod==0))or(i==lastval)): #checks if mod range has ended or the last value has been reached
-                #usage of the variables a,b,c....has been previously explained
-                data.at[counterforeachoctant,"+1"]=count1-a
-                data.at[counterforeachoctant,"-1"]=countm1-b
-                data.at[counterforeachoctant,"+2"]=count2-c
-                data.at[counterforeachoctant,"-2"]=countm2-d
-                data.at[counterforeachoctant,"+3"]=count3-e
-                data.at[counterforeachoctant,"-3"]=countm3-f
-                data.at[counterforeachoctant,"+4"]=count4-g
-                data.at[counterforeachoctant,"-4"]=countm4-h
-                a,b,c,d,e,f,g,h=count1,countm1,count2,countm2,count3,countm3,count4,countm4
-                counterforeachoctant+=1
-            else:
+        #The octant values of all the rows are calculated at once by octant_classify (see above), or
+        #come from the cache. All the counts are calculated from them as arrays. Only the Octant column
+        #is added to the input, the report is laid out separately by write_octant_transition_report
+        result=octant_transition_result(octants,mod)
+        data["Octant"]=octant_labels(octants)
+        write_octant_transition_report(result,"output_octant_transition_identify.xlsx",data)
+        return result
+
+
+#Help
+#Multi-mod version of octant_transition_count: the input is read and classified once and the tables of
+#all the mod values come from one set of prefix counts (see octant_transition_sweep)
+#The reports go to one sheet per mod value of output_octant_transition_identify.xlsx, or with
+#separate=True to output_octant_transition_identify_mod<mod>.xlsx for every mod value
+def octant_transition_count_sweep(mods,cache=True,filename="input_octant_transition_identify.xlsx",separate=False):
+    try:
+        for mod in mods:
+            mod=mod+5                #to check if the entered mod values are integers or not
+            mod=mod-5
+            a=mod+abs(mod)
+            a=mod/a
+        data,octants=read_octant_input(filename,cache)
+    except FileNotFoundError:
+        print("Incorrect file name")
+    except TypeError:
+        print("Incorrect value of mod entered. Please enter an integer value.")
+    except ZeroDivisionError:
+        print("Please enter a positive integral value of mod")
+    else:
+        results=octant_transition_sweep(octants,mods)
+        data["Octant"]=octant_labels(octants)
+        if(separate):
+            for result in results:
+                write_octant_transition_report(result,"output_octant_transition_identify_mod"+str(result.mod)+".xlsx",data)
+        else:
+            write_octant_transition_sweep(results,"output_octant_transition_identify.xlsx",data)
+        return results
+
+
+#Columns of the input which are needed to calculate the octants
+INPUT_COLUMNS=['U-u_avg','V-v_avg','W-w_avg']
+
+
+def read_octant_chunks(filename,chunksize=100000):
+    #Reads the U, V and W deviation columns of the input in chunks of "chunksize" rows so that the
+    #whole file never has to be in memory. CSV and Parquet files are read with their own chunked readers,
+    #xlsx files are read row by row through openpyxl's read-only mode and .octc files are memory-mapped
+    #Yields (u,v,w) tuples of float64 arrays
+    if filename.endswith(".csv"):
+        import pandas as pd
+        for chunk in pd.read_csv(filename,usecols=INPUT_COLUMNS,chunksize=chunksize):
+            yield (chunk['U-u_avg'].to_numpy(np.float64),chunk['V-v_avg'].to_numpy(np.float64),chunk['W-w_avg'].to_numpy(np.float64))
+    elif filename.endswith(".octc"):
+        columns=read_columnar(filename)
+        for start in range(0,len(columns['U-u_avg']),chunksize):
+            yield tuple(np.asarray(columns[name][start:start+chunksize],dtype=np.float64) for name in INPUT_COLUMNS)
+    elif filename.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(filename).iter_batches(batch_size=chunksize,columns=INPUT_COLUMNS):
+            yield tuple(batch.column(name).to_numpy(zero_copy_only=False).astype(np.float64) for name in INPUT_COLUMNS)
+    else:
+        import openpyxl
+        book=openpyxl.load_workbook(filename,read_only=True,data_only=True)
+        try:
+            rows=book.worksheets[0].iter_rows(values_only=True)
+            header=list(next(rows))
+            positions=[header.index(name) for name in INPUT_COLUMNS]
+            chunk=np.empty((chunksize,3),dtype=np.float64)
+            filled=0
+            for row in rows:
+                if(row[positions[0]] is None):   #empty rows at the end of the sheet
+                    continue
+                chunk[filled]=[row[p] for p in positions]
+                filled+=1
+                if(filled==chunksize):
+                    yield (chunk[:,0].copy(),chunk[:,1].copy(),chunk[:,2].copy())
+                    filled=0
+            if(filled):
+                yield (chunk[:filled,0].copy(),chunk[:filled,1].copy(),chunk[:filled,2].copy())
+        finally:
+            book.close()
+
+
+def grow_windows(array,size):
+    #Makes sure the per mod range array has room for "size" mod ranges, doubling it when it has to grow
+    if(len(array)>=size):
+        return array
+    grown=np.zeros((max(size,2*len(array)),)+array.shape[1:],dtype=array.dtype)
+    grown[:len(array)]=array
+    return grown
+
+
+def octant_transition_count_stream(filename,mod=5000,chunksize=100000):
+    #Streaming version of the octant counts and transition counts for inputs which do not fit in memory
+    #The input is read in chunks of "chunksize" rows, the octant of the last row of every chunk is carried
+    #over to the next chunk so that the transition across the chunk boundary is counted as well
+    #The counts of every mod range are added up chunk by chunk, so the memory used does not depend
+    #on the length of the input
+    #Returns an OctantTransitionResult, the same as octant_transition_count, which can be written out
+    #with write_octant_transition_report
+    try:
+        mod=mod+5                    #to check if entered mod value is an integer or not
+        mod=mod-5
+        a=mod+abs(mod)
+        a=mod/a
+        windowcounts=np.zeros((0,8),dtype=np.int64)
+        transitions=np.zeros((0,8,8),dtype=np.int64)
+        start=0          #index of the first row of the chunk in the whole input
+        carry=None       #octant (as an index 0-7) of the last row of the previous chunk
+        for u,v,w in read_octant_chunks(filename,chunksize):
+            if(len(u)==0):
                 continue
-        ##############################################33
-        
-
-
-
-
-
-        #####################################
-        #To count the total octant transitions
-        #We iterate through all the values in the dataframe in the "octant" column
-        #if there is a change in the value from ith to (i+1)th octant value then the position of writing 
-        #in the excel sheet is stored in the two variables "toposition" and "fromposition" to uniquely
-        #write to a particular cell in the excel sheet
-        for i in range(0,lastval,1):
-            values=["+1","-1","+2","-2","+3","-3","+4","-4"]
-            for j in range(0,8,1):
-                if(values[j]==data["Octant"][i]):
-                    fromposition=(multiply+1)+1+7+j
-                if(values[j]==data["Octant"][i+1]):
-                    toposition=values[j]
-            if(not(data[toposition][fromposition])):
-                data.at[fromposition,toposition]=1 
-            else:    
-                data.at[fromposition,toposition]=data[toposition][fromposition]+1
-        ######################################
-            
-
-        #We initialize all the octant transitions in each mod range by filling the matrix with zeroes
-        #the variable k helps to get to the beginning of a new table of writing cells
-        #the exact position of the writing cells is determined by two variables "toposition" and "fromposition"
-        for k in range(1,multiply+2,1):
-            values=["+1","-1","+2","-2","+3","-3","+4","-4"]
-            for i in range(0,8,1):
-                for j in range(0,8,1):
-                    fromposition=1+multiply+1+8+(13*k)+i
-                    toposition=values[j]
-                    data.at[fromposition,toposition]=0 
-
-
-
-        ##########################################3
-        #Writing down the table headers and other values before writing the transition counts
-        for k in range(1,multiply+2,1):
-            data.at[1+(multiply+1)+5+(13*k),"Octant ID"]="Mod Transition Count"
-            data.at[1+(multiply+1)+6+(13*k),"+1"]="To"
-            data.at[1+(multiply+1)+7+(13*k),"Octant ID"]="Count"
-            data.at[1+(multiply+1)+8+(13*k),""]="From"
-            if(k==1):
-                data.at[1+(multiply+1)+6+(13*k),"Octant ID"]="0000"+"-"+str(mod-1)
-            else:
-                if(k<=multiply):
-                    num=str(mod*(k-1))+"-"+str(mod*(k) - 1)
-                    data.at[1+(multiply+1)+6+(13*k),"Octant ID"]=num
-                else:
-                    num=str(mod*(k))+"-"+str(lastval)
-                    data.at[1+(multiply+1)+6+(13*k),"Octant ID"]=num    
-            listofvalues=["+1","-1","+2","-2","+3","-3","+4","-4"]
-            for i in range(1+(multiply+1)+8+(13*k),1+(multiply+1)+16+(13*k),1):
-                data.at[i,"Octant ID"]=listofvalues[i-(1+(multiply+1)+8+(13*k))]
-            for j in range(0,8,1):
-                data.at[1+(multiply+1)+7+(13*k),listofvalues[j]]=listofvalues[j]
-            #######################################
-
-
-            
-            for i in range(mod*(k-1),mod*(k),1):
-                if(i==lastval):
-                    break
-                values=["+1","-1","+2","-2","+3","-3","+4","-4"]
-                for j in range(0,8,1):
-                    if(values[j]==data["Octant"][i]):
-                        fromposition=1+multiply+1+8+(13*k)+j
-                    if(values[j]==data["Octant"][i+1]):
-                        toposition=values[j]
-                if(not(data[toposition][fromposition])):
-                    data.at[fromposition,toposition]=1 #inserts 1 if value is empty
-                else:    
-                    data.at[fromposition,toposition]=data[toposition][fromposition]+1   #adds 1 if value is not empty          
-
-        data.at[0,"+1"]=count1
-        data.at[0,"-1"]=countm1
-        data.at[0,"+2"]=count2
-        data.at[0,"-2"]=countm2
-        data.at[0,"+3"]=count3
-        data.at[0,"-3"]=countm3
-        data.at[0,"+4"]=count4
-        data.at[0,"-4"]=countm4
-
-        #For the final verification of overall counts after individually adding the  counts in each mod range
-        data.at[1+multiply+2,"Octant ID"]="Verified"
-        verificationcountlist=[0,0,0,0,0,0,0,0]
-        for j in range(0,8,1):
-            values=["+1","-1","+2","-2","+3","-3","+4","-4"]
-            for i in range(2,(1+multiply+2),1):
-                verificationcountlist[j]=verificationcountlist[j]+data[(values[j])][i]
-            data.at[1+multiply+2,values[j]]=verificationcountlist[j]
-
-
-        data.to_excel("output_octant_transition_identify.xlsx",index=False)
+            index=octant_index(octant_classify(u,v,w))
+            positions=np.arange(start,start+len(index),dtype=np.intp)
+
+            #octant counts of the mod ranges covered by this chunk
+            first=start//mod
+            last=(start+len(index)-1)//mod
+            windowcounts=grow_windows(windowcounts,last+1)
+            windowcounts[first:last+1]+=np.bincount((positions//mod-first)*8+index,minlength=(last-first+1)*8).reshape(-1,8)
+
+            #transitions, the "from" row decides the mod range of the transition
+            if(carry is not None):
+                index=np.concatenate(([carry],index))
+                positions=np.concatenate(([start-1],positions))
+            if(len(index)>1):
+                first=positions[0]//mod
+                last=positions[-2]//mod
+                transitions=grow_windows(transitions,last+1)
+                pairs=(positions[:-1]//mod-first)*64+index[:-1]*8+index[1:]
+                transitions[first:last+1]+=np.bincount(pairs,minlength=(last-first+1)*64).reshape(-1,8,8)
+
+            carry=index[-1]
+            start+=len(u)
+        if(start==0):
+            print("The input file has no rows")
+            return None
+        lastval=start-1
+        n_windows=lastval//mod+1
+        windowcounts=grow_windows(windowcounts,n_windows)[:n_windows]
+        transitions=grow_windows(transitions,n_windows)[:n_windows]
+        return OctantTransitionResult(mod,lastval,windowcounts.sum(axis=0),windowcounts,transitions)
+    except FileNotFoundError:
+        print("Incorrect file name")
+    except TypeError:
+        print("Incorrect value of mod entered. Please enter an integer value.")
+    except ZeroDivisionError:
+        print("Please enter a positive integral value of mod")
 
 
-from platform import python_version
-ver = python_version()
+def octant_sliding_count(filename,size,stride=1,outputfile="output_octant_sliding_windows.csv",chunksize=100000):
+    #Sliding window mode: counts and transitions of windows of "size" rows every "stride" rows
+    #The input is read in chunks as in octant_transition_count_stream, only the int8 octant column of
+    #the whole input is kept, and the windows are written with write_sliding_windows
+    #Returns (starts, counts, transitions) of octant_sliding_windows
+    try:
+        octants=[octant_classify(u,v,w) for u,v,w in read_octant_chunks(filename,chunksize)]
+        octants=np.concatenate(octants) if octants else np.zeros(0,dtype=np.int8)
+        if(len(octants)==0):
+            print("The input file has no rows")
+            return None
+        starts,counts,transitions=octant_sliding_windows(octants,size,stride)
+        write_sliding_windows(outputfile,starts,size,len(octants),counts,transitions)
+        return starts,counts,transitions
+    except FileNotFoundError:
+        print("Incorrect file name")
+    except ValueError:
+        print("Please enter positive integral values of window size and stride")
 
-if ver == "3.8.10":
-    print("Correct Version Installed")
-else:
-    print("Please install 3.8.10. Instruction are present in the GitHub Repo/Webmail. Url: https://pastebin.com/nvibxmjw")
 
+if __name__ == "__main__":
+    from platform import python_version
+    ver = python_version()
 
-mod=5000
-octant_transition_count(mod)
\ No newline at end of file
+    if ver == "3.8.10":
+        print("Correct Version Installed")
+    else:
+        print("Please install 3.8.10. Instruction are present in the GitHub Repo/Webmail. Url: https://pastebin.com/nvibxmjw")
+
+
+    #python tut02.py                      - the tutorial input, input_octant_transition_identify.xlsx
+    #python tut02.py <input file> [mod]   - streaming mode for large csv, parquet, xlsx or octc inputs
+    #python tut02.py ingest <workbook>    - converts the workbook to a memory-mapped .octc file
+    #python tut02.py sweep <mod> <mod> ... [--separate]
+    #                                     - the tutorial input for several mod values, one sheet (or file) per mod value
+    #python tut02.py sliding <input file> <size> [stride]
+    #                                     - counts and transitions of sliding windows to output_octant_sliding_windows.csv
+    if len(sys.argv)>2 and sys.argv[1]=="ingest":
+        for workbook in sys.argv[2:]:
+            print("Ingested "+workbook+" to "+ingest_octant_input(workbook))
+    elif len(sys.argv)>2 and sys.argv[1]=="sweep":
+        mods=[int(mod) for mod in sys.argv[2:] if mod!="--separate"]
+        octant_transition_count_sweep(mods,separate="--separate" in sys.argv)
+    elif len(sys.argv)>3 and sys.argv[1]=="sliding":
+        stride=int(sys.argv[4]) if len(sys.argv)>4 else 1
+        octant_sliding_count(sys.argv[2],int(sys.argv[3]),stride)
+    elif len(sys.argv)>1:
+        mod=int(sys.argv[2]) if len(sys.argv)>2 else 5000
+        result=octant_transition_count_stream(sys.argv[1],mod)
+        if result is not None:
+            write_octant_transition_report(result,"output_octant_transition_identify.xlsx")
+    else:
+        mod=5000
+        octant_transition_count(mod)
\ No newline at end of file
@@ -1,6 +1,8 @@
 import socket
 import sys
 
+from protocol import FrameDecoder, encode_message, recv_message
+
 # Creating a new socket
 client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
@@ -9,6 +11,20 @@ client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 server_ip = sys.argv[1]
 server_port = int(sys.argv[2])
 
+# Load generator mode: python client.py <ip> <port> --load [--connections N] [--requests R | --duration S] [--rate RPS]
+# Many connections send expressions without any input, and the throughput and latencies are printed (see loadgen.py)
+if "--load" in sys.argv:
+    import loadgen
+    loadgen.main([arg for arg in sys.argv[1:] if arg != "--load"])
+    exit(0)
+
+# Pipelined mode: python client.py <ip> <port> --pipeline [--count N] [--in-flight K] [--batch B]
+# Calculates N expressions keeping K requests in flight, every request a batch of B expressions (see pipeline.py)
+if "--pipeline" in sys.argv:
+    import pipeline
+    pipeline.main([arg for arg in sys.argv[1:] if arg != "--pipeline"])
+    exit(0)
+
 print(f"Connecting to the server {server_ip} port {server_port}...")
 
 # Creating a Fake Client for server1.
@@ -38,17 +54,23 @@ except:
 
 print("\nConnection established.")
 client_socket.settimeout(None)
+
+# Splits the data received from the server into messages (see protocol.py)
+decoder = FrameDecoder()
+
 # The client will keep on the sending and receiving messages as long as the client does not wish to continue, and breaks
 while True:
     print("\nEnter the message to send to the server: ", end="")
 
     # Taking input - the message to send to the server
     str = input()
-    client_socket.sendall(bytes(str, "utf-8"))
+    client_socket.sendall(encode_message(str))
 
-    # Receving reply from the server in bytes and decoding it to a string
-    msg = client_socket.recv(1024)
-    msg = msg.decode()
+    # Receving the reply from the server. It may arrive in several parts, recv_message waits for the whole of it
+    msg = recv_message(client_socket, decoder)
+    if msg is None:
+        print("\nThe server closed the connection")
+        break
     print(f"\nServer replied: {msg}")
 
     # Asking if the client wishes to continue. If yes, repeat the above process. Otherwise, break.
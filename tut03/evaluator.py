@@ -0,0 +1,117 @@
+import ast
+import operator
+from functools import lru_cache
+
+# Safe calculator used by the servers instead of eval()
+# eval() runs any Python code a client sends (for example __import__('os').system(...)), and parses and compiles
+# the text again for every request. Here the expression is parsed into an AST, and only numbers, brackets and
+# arithmetic operators are accepted. The expressions have no variables, so once an expression is checked and
+# calculated its answer never changes: the answers are kept in an LRU cache keyed by the text of the expression
+
+# Limits, so that a single request cannot stall the server (9**9**9 for example would take hours)
+MAX_EXPRESSION_LENGTH = 1000      # characters of the expression
+MAX_NODES = 200                   # numbers and operators in the expression
+MAX_INT_BITS = 10000              # size of any integer calculated, about 3000 digits
+CACHE_SIZE = 4096                 # expressions whose answers are kept
+
+class ExpressionError(ValueError):
+    pass
+
+class ExpressionTooLarge(ExpressionError):
+    pass
+
+def check_int(value):
+
+    # Integers above the size limit are refused. Floats cannot grow, they overflow to an error or to inf
+    if isinstance(value, int) and value.bit_length() > MAX_INT_BITS:
+        raise ExpressionTooLarge("Result too large")
+    return value
+
+def int_bits(value):
+    return value.bit_length() if isinstance(value, int) else 0
+
+def safe_pow(base, exponent):
+
+    # The size of an integer power is known before calculating it: about bits(base) * exponent
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        if (abs(base).bit_length() - 1) * exponent > MAX_INT_BITS:
+            raise ExpressionTooLarge("Result too large")
+    # A negative number to a fractional power is a complex number. The calculator only answers with real numbers
+    result = operator.pow(base, exponent)
+    if isinstance(result, complex):
+        raise ExpressionError("Invalid expression")
+    return check_int(result)
+
+def safe_mul(a, b):
+    if int_bits(a) + int_bits(b) > MAX_INT_BITS + 1:
+        raise ExpressionTooLarge("Result too large")
+    return operator.mul(a, b)
+
+def safe_lshift(a, b):
+    if b > MAX_INT_BITS:
+        raise ExpressionTooLarge("Result too large")
+    return check_int(operator.lshift(a, b))
+
+# The operators which are allowed, and the functions calculating them
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: safe_mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: safe_pow,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+    ast.LShift: safe_lshift,
+    ast.RShift: operator.rshift,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+    ast.Invert: operator.invert,
+}
+
+def evaluate_node(node):
+
+    # Calculates the value of a node of the AST. Anything other than a number or an allowed operator is refused
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return check_int(node.value)
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        return check_int(BINARY_OPERATORS[type(node.op)](evaluate_node(node.left), evaluate_node(node.right)))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        return UNARY_OPERATORS[type(node.op)](evaluate_node(node.operand))
+    raise ExpressionError("Invalid expression")
+
+def evaluate(expression):
+
+    # Checks the expression against the limits, parses it and calculates its value
+    # Raises ExpressionTooLarge for expressions over the limits and ExpressionError for anything else which is wrong
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionTooLarge("Expression too long")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        raise ExpressionError("Invalid expression")
+    if sum(1 for node in ast.walk(tree)) > MAX_NODES:
+        raise ExpressionTooLarge("Expression too long")
+    try:
+        return evaluate_node(tree.body)
+    except (ArithmeticError, TypeError, ValueError) as e:
+        if isinstance(e, ExpressionError):
+            raise
+        raise ExpressionError("Invalid expression")
+
+@lru_cache(maxsize=CACHE_SIZE)
+def calculate(expression):
+
+    # The answer sent to the client for an expression: its value, or an error message
+    # Error messages are cached as well, so repeating a bad or too large expression costs nothing either
+    try:
+        return str(evaluate(expression))
+    except ExpressionTooLarge as e:
+        return "ERROR: " + str(e)
+    except ExpressionError:
+        return "ERROR: Invalid expression"
@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import itertools
+import math
+import time
+
+from protocol import encode_message
+
+# Load generator for the tut03 servers, used by "python client.py <ip> <port> --load ..."
+# It opens a number of connections with asyncio, every connection sends expressions and waits for their replies,
+# and the latency of every request is recorded. At the end the throughput and the latency percentiles are printed,
+# so that the blocking (server1), threaded (server2), select (server3, server4) and asyncio (server5) servers can
+# be compared with the same load
+
+# Expressions sent when no mix is given
+DEFAULT_EXPRESSIONS = ["1+1", "12*(3+4)-5/2", "2**64", "7//3", "(1.5+2.5)*3"]
+
+def percentile(sorted_values, p):
+
+    # p-th percentile (0 to 100) of a sorted list, the nearest rank method: the smallest value with at least p% of
+    # the values at or below it. p * n is divided last so that for example p=7, n=100 gives exactly rank 7
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p * len(sorted_values) / 100), 1)
+    return sorted_values[rank - 1]
+
+async def run_connection(server_ip, server_port, expressions, requests, deadline, interval, stats, connect_timeout):
+
+    # One connection of the load. It sends the expressions one after the other and waits for each reply
+    # With a target rate, the requests are sent at fixed times (one every "interval" seconds) and the latency is
+    # measured from the time the request should have been sent, so a server which falls behind is not hidden
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(server_ip, server_port), connect_timeout)
+    except (OSError, asyncio.TimeoutError):
+        stats["failed_connections"] += 1
+        return
+
+    start = time.perf_counter()
+    try:
+        for k in itertools.count():
+            if (requests is not None and k >= requests) or (deadline is not None and time.perf_counter() >= deadline):
+                break
+            scheduled = time.perf_counter()
+            if interval:
+                scheduled = start + k * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            writer.write(encode_message(next(expressions)))
+            reply = await reader.readline()
+            if reply == b'':
+                stats["closed_connections"] += 1
+                break
+            stats["latencies"].append(time.perf_counter() - scheduled)
+            if reply.startswith(b"ERROR"):
+                stats["errors"] += 1
+    except (ConnectionError, OSError):
+        stats["closed_connections"] += 1
+    finally:
+        writer.close()
+
+async def run_load(server_ip, server_port, connections=10, requests=None, duration=None, rate=None, expressions=None, connect_timeout=5):
+
+    # Runs the load and returns the statistics. Every connection sends "requests" requests, or sends requests for
+    # "duration" seconds. "rate" is the target number of requests per second of all the connections together,
+    # None sends them as fast as the server answers. The expressions are sent in turn from the list "expressions"
+    expressions = itertools.cycle(expressions or DEFAULT_EXPRESSIONS)
+    if requests is None and duration is None:
+        requests = 1000
+    interval = connections / rate if rate else None
+    stats = {"latencies": [], "errors": 0, "failed_connections": 0, "closed_connections": 0}
+
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else None
+    await asyncio.gather(*[run_connection(server_ip, server_port, expressions, requests, deadline, interval, stats, connect_timeout) for i in range(connections)])
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+def print_stats(stats, connections):
+    latencies = sorted(stats["latencies"])
+    elapsed = stats["elapsed"]
+    print(f"Connections: {connections} ({stats['failed_connections']} failed to connect, {stats['closed_connections']} closed by the server)")
+    print(f"Requests:    {len(latencies)} in {elapsed:.2f} s, {stats['errors']} error replies")
+    print(f"Throughput:  {len(latencies) / elapsed if elapsed > 0 else 0:.0f} requests/s")
+    print("Latency:     p50 {:.3f} ms, p95 {:.3f} ms, p99 {:.3f} ms, max {:.3f} ms".format(
+        percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000, percentile(latencies, 99) * 1000, (latencies[-1] if latencies else 0) * 1000))
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="client.py <ip> <port> --load", description="Load generator for the tut03 servers")
+    parser.add_argument("--connections", type=int, default=10, help="number of concurrent connections (default 10)")
+    parser.add_argument("--requests", type=int, help="requests sent by every connection (default 1000)")
+    parser.add_argument("--duration", type=float, help="send requests for this many seconds instead of a number of requests")
+    parser.add_argument("--rate", type=float, help="target requests per second of all the connections together (default: as fast as possible)")
+    parser.add_argument("--expressions", help="comma separated expressions to send in turn, repeat one to send it more often")
+    parser.add_argument("--connect-timeout", type=float, default=5, help="seconds to wait for a connection (default 5)")
+    server_ip, server_port, args = argv[0], int(argv[1]), parser.parse_args(argv[2:])
+
+    expressions = args.expressions.split(",") if args.expressions else None
+    print(f"Sending load to the server {server_ip} port {server_port}...")
+    stats = asyncio.run(run_load(server_ip, server_port, args.connections, args.requests, args.duration, args.rate, expressions, args.connect_timeout))
+    print_stats(stats, args.connections)
+    return stats
@@ -0,0 +1,131 @@
+import argparse
+import select
+import socket
+import time
+
+from loadgen import DEFAULT_EXPRESSIONS
+from protocol import MAX_BATCH_SIZE, FrameDecoder, encode_messages
+
+# Pipelined client for the calculator servers, used by "python client.py <ip> <port> --pipeline ..." or imported:
+#
+#     client = PipelinedClient("127.0.0.1", 5000, in_flight=32, batch_size=100)
+#     results = client.calculate_many(["1+1", "2*3", ...])
+#
+# Waiting for the reply of every expression before sending the next one costs a round trip and two system calls
+# per expression. Here up to "in_flight" requests are sent without waiting for their replies, and every request can
+# be a batch of "batch_size" expressions (see protocol.py), which the server calculates in one go and answers with
+# a single send. The servers answer the requests of a connection in order, so the results come back in order
+
+class PipelinedClient:
+
+    def __init__(self, server_ip, server_port, in_flight=32, batch_size=1, timeout=None):
+        self.sock = socket.create_connection((server_ip, server_port), timeout)
+
+        # Small requests are sent right away instead of being held back by Nagle's algorithm
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # The socket is non-blocking: calculate_many waits with select, so that it can read the replies while it is
+        # still sending. Otherwise, with many requests in flight, the client could block sending while the server
+        # blocks sending its replies to the client, and both would wait for ever
+        self.sock.setblocking(False)
+        self.decoder = FrameDecoder()
+        self.in_flight = in_flight
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+    def calculate(self, expression):
+        return self.calculate_many([expression], batch_size=1)[0]
+
+    def calculate_batch(self, expressions):
+
+        # Sends the expressions as one batch and returns their results
+        return self.calculate_many(expressions, batch_size=max(len(expressions), 1))
+
+    def calculate_many(self, expressions, in_flight=None, batch_size=None):
+
+        # Returns the results of the expressions, in the same order
+        in_flight = in_flight or self.in_flight
+        batch_size = batch_size or self.batch_size
+        if batch_size > MAX_BATCH_SIZE:
+            raise ValueError(f"Batches are limited to {MAX_BATCH_SIZE} expressions")
+
+        # With batches, every request is a list of expressions
+        expressions = list(expressions)
+        if batch_size > 1:
+            requests = [expressions[i:i + batch_size] for i in range(0, len(expressions), batch_size)]
+        else:
+            requests = expressions
+
+        results = []
+        buffer = bytearray()
+        sent = received = 0
+        while received < len(requests):
+
+            # Adding requests to the outgoing buffer as long as fewer than in_flight wait for their replies
+            if sent < len(requests) and sent - received < in_flight:
+                end = min(received + in_flight, len(requests))
+                buffer += encode_messages(requests[sent:end])
+                sent = end
+
+            readable, writable, _ = select.select([self.sock], [self.sock] if buffer else [], [], self.timeout)
+            if not readable and not writable:
+                raise TimeoutError("No reply from the server")
+
+            if writable:
+                del buffer[:self.sock.send(buffer)]
+
+            if readable:
+                for reply in self.receive():
+                    request = requests[received]
+                    if isinstance(request, list) != isinstance(reply, list) or (isinstance(reply, list) and len(reply) != len(request)):
+                        raise ValueError(f"Unexpected reply from the server: {reply}")
+                    if isinstance(reply, list):
+                        results.extend(reply)
+                    else:
+                        results.append(reply)
+                    received += 1
+        return results
+
+    def receive(self):
+
+        # The replies (a list for a batch) completed by the data waiting on the socket
+        try:
+            data = self.sock.recv(65536)
+        except BlockingIOError:
+            return []
+        if data == b'':
+            raise ConnectionError("The server closed the connection")
+        return self.decoder.feed(data)
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="client.py <ip> <port> --pipeline", description="Pipelined client for the tut03 servers")
+    parser.add_argument("--count", type=int, default=100000, help="number of expressions to calculate (default 100000)")
+    parser.add_argument("--in-flight", type=int, default=32, help="requests sent without waiting for their replies (default 32)")
+    parser.add_argument("--batch", type=int, default=1, help="expressions in every request, 1 sends no batches (default 1)")
+    parser.add_argument("--expressions", help="comma separated expressions to send in turn")
+    parser.add_argument("--timeout", type=float, default=10, help="seconds to wait for the server (default 10)")
+    server_ip, server_port, args = argv[0], int(argv[1]), parser.parse_args(argv[2:])
+
+    mix = args.expressions.split(",") if args.expressions else DEFAULT_EXPRESSIONS
+    expressions = [mix[i % len(mix)] for i in range(args.count)]
+    print(f"Sending {args.count} expressions to the server {server_ip} port {server_port}, "
+          f"{args.in_flight} requests in flight of {args.batch} expressions each...")
+
+    with PipelinedClient(server_ip, server_port, args.in_flight, args.batch, args.timeout) as client:
+        start = time.perf_counter()
+        results = client.calculate_many(expressions)
+        elapsed = time.perf_counter() - start
+
+    errors = sum(1 for result in results if result.startswith("ERROR"))
+    print(f"Results:    {len(results)} in {elapsed:.2f} s, {errors} error replies")
+    print(f"Throughput: {len(results) / elapsed if elapsed > 0 else 0:.0f} expressions/s")
+    return results
@@ -0,0 +1,131 @@
+from collections import deque
+
+# Message framing shared by the client and all the servers
+# Every message (an expression, or a reply) is sent as UTF-8 text followed by a newline. TCP is a stream of bytes,
+# so one recv() can return part of a message, or several messages at once. FrameDecoder collects the received
+# bytes and splits them into whole messages, which lets a client send many expressions without waiting for
+# the replies, and the server answer all of them with a single send
+
+# Longest message accepted, in bytes. A peer sending more than this without a newline is an error
+MAX_MESSAGE_SIZE = 65536
+
+# Batches: the message "BATCH n" announces that the n messages after it form a single request. The server waits
+# for all of them, calculates them in one go, and answers with "BATCH n" followed by the n replies in the same order,
+# all in one send. The decoder returns a batch as the list of its messages
+# A header whose count is not a number, or is above MAX_BATCH_SIZE, is an ordinary message: its reply is an error
+# message, and the messages after it are answered one by one
+BATCH_HEADER = "BATCH"
+MAX_BATCH_SIZE = 10000
+
+# Most bytes held for a batch which is not complete yet. A peer sending more than this is an error
+MAX_BATCH_BYTES = 16 * MAX_MESSAGE_SIZE
+
+# Timeouts of the servers, in seconds. A client which sends nothing for IDLE_TIMEOUT seconds is disconnected, and so
+# is a client which takes longer than READ_TIMEOUT seconds to finish a message (or a batch) it has started to send
+# Otherwise dead or stalled clients would keep their connections, and the servers' resources, for ever
+IDLE_TIMEOUT = 300
+READ_TIMEOUT = 30
+
+def encode_message(msg):
+
+    # A newline inside the message would split it in two, so it is replaced by a space
+    return bytes(str(msg).replace("\n", " ") + "\n", "utf-8")
+
+def encode_batch(msgs):
+    return encode_message(f"{BATCH_HEADER} {len(msgs)}") + b"".join(encode_message(msg) for msg in msgs)
+
+def encode_messages(msgs):
+
+    # Several messages in one buffer, to be sent with a single send. A list in msgs is sent as a batch
+    return b"".join(encode_batch(msg) if isinstance(msg, list) else encode_message(msg) for msg in msgs)
+
+def batch_size(msg):
+
+    # The number of messages announced by a batch header, or None if msg is not a batch header
+    header, _, count = msg.partition(" ")
+    if header != BATCH_HEADER or not (count.isascii() and count.isdigit()) or int(count) > MAX_BATCH_SIZE:
+        return None
+    return int(count)
+
+class FrameDecoder:
+
+    def __init__(self, max_size=MAX_MESSAGE_SIZE):
+        self.max_size = max_size
+        self.buffer = bytearray()
+
+        # Messages decoded but not yet taken by recv_message
+        self.pending = deque()
+
+        # The messages received so far of a batch which is not complete, the number it announced, and their size
+        self.batch = None
+        self.batch_count = 0
+        self.batch_bytes = 0
+
+        # When the client started the message it has not finished yet (see deadline)
+        self.partial_since = None
+
+    def feed(self, data):
+
+        # Adds the received bytes and returns the list of the messages completed by them
+        # Only the new bytes are searched for a newline, so a long message arriving in many small reads is not
+        # scanned again every time. The bytes after the last newline are kept for the next call
+        # A "\r" before the newline is dropped, so that terminals and telnet can be used as clients too
+        self.buffer += data
+        if b"\n" not in data:
+            frames = []
+        else:
+            *frames, rest = self.buffer.split(b"\n")
+            self.buffer = bytearray(rest)
+            self.partial_since = None
+        if len(self.buffer) > self.max_size:
+            raise ValueError("Message longer than " + str(self.max_size) + " bytes")
+        return self.collect_batches(frame.rstrip(b"\r").decode("utf-8", "replace") for frame in frames)
+
+    def partial(self):
+
+        # True while part of a message, or of a batch, has been received
+        return bool(self.buffer) or self.batch is not None
+
+    def deadline(self, now):
+
+        # The time by which the client must send more data, called after feed() with the current time.monotonic()
+        # A client which has started a message gets READ_TIMEOUT seconds from the first of its bytes, or from the last
+        # message it completed, to finish it. Otherwise the client may stay idle for IDLE_TIMEOUT seconds
+        if not self.partial():
+            self.partial_since = None
+            return now + IDLE_TIMEOUT
+        if self.partial_since is None:
+            self.partial_since = now
+        return self.partial_since + READ_TIMEOUT
+
+    def collect_batches(self, frames):
+
+        # Replaces the messages of every complete batch by the list of them. The messages of a batch which is
+        # not complete yet are kept until the next call
+        msgs = []
+        for frame in frames:
+            if self.batch is not None:
+                self.batch.append(frame)
+                self.batch_bytes += len(frame)
+                if self.batch_bytes > MAX_BATCH_BYTES:
+                    raise ValueError("Batch longer than " + str(MAX_BATCH_BYTES) + " bytes")
+            else:
+                count = batch_size(frame)
+                if count is None:
+                    msgs.append(frame)
+                    continue
+                self.batch, self.batch_count, self.batch_bytes = [], count, 0
+            if len(self.batch) == self.batch_count:
+                msgs.append(self.batch)
+                self.batch = None
+        return msgs
+
+def recv_message(sock, decoder, bufsize=4096):
+
+    # Receives the next message (a list for a batch) from a blocking socket. Returns None if the connection was closed
+    while not decoder.pending:
+        data = sock.recv(bufsize)
+        if data == b'':
+            return None
+        decoder.pending.extend(decoder.feed(data))
+    return decoder.pending.popleft()
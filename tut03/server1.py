@@ -1,5 +1,9 @@
 import socket
 import sys
+import time
+
+from evaluator import calculate
+from protocol import IDLE_TIMEOUT, FrameDecoder, encode_messages
 
 # Creating server socket
 server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -12,6 +16,10 @@ server_port = int(sys.argv[2])
 server_socket.bind((server_ip, server_port))
 server_socket.listen(0)
 
+# Counts of the clients disconnected for staying idle, and for taking too long to finish a message (see protocol.py)
+idle_evictions = 0
+read_evictions = 0
+
 # The server will always keep running (as it realistically should), unless force quit using Ctrl+C
 while True:
 
@@ -24,10 +32,28 @@ while True:
 
     print(f"\nConnected to client {client_addr}\n")
 
+    # Splits the received bytes into newline terminated messages (see protocol.py)
+    decoder = FrameDecoder()
+
     while True:
         
-        # Receiving message from the client
-        msg_bytes = client_conn.recv(1024)
+        # Receiving data from the client. It can hold part of a message, or several messages
+        # The receive waits at most until the client's deadline: a client which stays idle, or is too slow to finish
+        # a message, would otherwise keep the server (which serves one client at a time) for ever
+        now = time.monotonic()
+        client_conn.settimeout(max(decoder.deadline(now) - now, 0.001))
+        try:
+            msg_bytes = client_conn.recv(4096)
+        except socket.timeout:
+            if decoder.partial():
+                read_evictions += 1
+                print("Client took too long to finish its message. Closing the connection")
+            else:
+                idle_evictions += 1
+                print("Client was idle for too long. Closing the connection")
+            print(f"Clients disconnected: {idle_evictions} idle, {read_evictions} too slow\n")
+            client_conn.close()
+            break
 
         # If the client closes the connection using conn.close(), the message received has 0 bytes
         if msg_bytes == b'':
@@ -35,19 +61,47 @@ while True:
             client_conn.close()
             break
 
-        # The message received is in the form of bytes. Decoding it to a string
-        msg = msg_bytes.decode()
-        print (f"Recived expression {msg} from client")
-        
-        # Calculating the value of the received expression using eval(). Error is it is an invalid expression
         try:
-            ans = eval(msg)
-        except:
-            ans = "ERROR: Invalid expression"
-        ans = str(ans)
-        print(f"Sending answer {ans} to the client\n")
-
-        # Sending the reply to the client, and storing the length of the message sent
-        lenth = client_conn.sendall(bytes(ans, "utf-8"))
+            msgs = decoder.feed(msg_bytes)
+        except ValueError as e:
+            print(f"{e}. Closing the connection\n")
+            client_conn.close()
+            break
+
+        answers = []
+        for msg in msgs:
+
+            # A batch (see protocol.py) is calculated in one go, and answered with a batch of replies in the same order
+            if isinstance(msg, list):
+                print(f"Recived a batch of {len(msg)} expressions from client")
+                answers.append([calculate(expression) for expression in msg])
+                print(f"Sending a batch of {len(msg)} answers to the client\n")
+                continue
+
+            print (f"Recived expression {msg} from client")
+        
+            # Calculating the value of the received expression with the safe calculator (see evaluator.py)
+            # It returns an error message for an invalid expression, or one which is too large to calculate
+            ans = calculate(msg)
+            print(f"Sending answer {ans} to the client\n")
+            answers.append(ans)
+
+        # Sending the replies to all the messages of this recv to the client at once
+        # A client which does not read its replies gets IDLE_TIMEOUT seconds, like one which sends nothing, and
+        # is then disconnected as too slow. A client which disappeared is disconnected too
+        if answers:
+            client_conn.settimeout(IDLE_TIMEOUT)
+            try:
+                client_conn.sendall(encode_messages(answers))
+            except socket.timeout:
+                read_evictions += 1
+                print("Client did not read its answers for too long. Closing the connection")
+                print(f"Clients disconnected: {idle_evictions} idle, {read_evictions} too slow\n")
+                client_conn.close()
+                break
+            except OSError as e:
+                print(f"Error encountered ({e}). Closing the connection\n")
+                client_conn.close()
+                break
 
 server_socket.close()
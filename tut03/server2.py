@@ -1,6 +1,11 @@
+import queue
 import socket
 import sys
-from _thread import *
+import threading
+import time
+
+from evaluator import calculate
+from protocol import FrameDecoder, encode_message, encode_messages
 
 # Creating server socket
 server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -9,62 +14,171 @@ server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 server_ip = sys.argv[1]
 server_port = int(sys.argv[2])
 
+# The clients are served by a fixed pool of worker threads instead of a new thread for every client
+# The number of workers, and the number of accepted clients which may wait for a free worker, can be given
+# as optional command line arguments: python server2.py <ip> <port> [workers] [queue size]
+pool_size = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+queue_size = int(sys.argv[4]) if len(sys.argv) > 4 else 64
+
 # Binding the server socket to listen to the given IP address and port number
 server_socket.bind((server_ip, server_port))
-server_socket.listen(0)
+server_socket.listen(queue_size)
+
+# Accepted clients waiting for a free worker. The queue is bounded, so a connection storm cannot pile up
+# threads or memory. When it is full, new clients are told that the server is busy and disconnected
+pending_clients = queue.Queue(maxsize=queue_size)
 
-# Maintaining a count of the number of clients connected
+# Maintaining a count of the number of clients connected, and the sockets of the clients being served
+# They are shared by all the threads, so they are only used while holding clients_lock
 clients_connected = 0
+active_clients = set()
+clients_lock = threading.Lock()
+
+# Counts of the clients disconnected for staying idle, and for taking too long to finish a message (see protocol.py)
+# They are changed while holding clients_lock too
+idle_evictions = 0
+read_evictions = 0
+shutting_down = False
 
 def calc(client_connection, client_address):
 
-    # Using the global clients_connected variable
-    global clients_connected
-    
+    # Using the global eviction counts
+    global idle_evictions, read_evictions
+
+    # Splits the received bytes into newline terminated messages (see protocol.py)
+    decoder = FrameDecoder()
+
     while True:
 
-        # Receiving message from the client
-        msg_bytes = client_connection.recv(1024)
+        # Receiving data from the client. It can hold part of a message, or several messages
+        # The receive waits at most until the client's deadline: a client which stays idle, or is too slow to finish
+        # a message, would otherwise keep its worker for ever, and a few of them would stop the whole pool
+        now = time.monotonic()
+        client_connection.settimeout(max(decoder.deadline(now) - now, 0.001))
+        try:
+            msg_bytes = client_connection.recv(4096)
+        except socket.timeout:
+            with clients_lock:
+                if decoder.partial():
+                    read_evictions += 1
+                    reason = "took too long to finish its message"
+                else:
+                    idle_evictions += 1
+                    reason = "was idle for too long"
+                counts = f"{idle_evictions} idle, {read_evictions} too slow"
+            print(f"Client {client_address} {reason}. Closing its connection")
+            print(f"Clients disconnected: {counts}")
+            break
 
         # If the message size is 0, the client has closed the connection
         if msg_bytes == b'':
-            clients_connected -= 1
             print(f"Closing the connection of client {client_address}")
-            print(f"{clients_connected} clients currently connected\n")
-            client_connection.close()
             break
-        
-       # The message received is in the form of bytes. Decoding it to a string
-        msg = msg_bytes.decode()
-        print (f"Recived expression {msg} from client {client_address}")
-        
-        # Calculating the value of the received expression using eval(). Error is it is an invalid expression
+
+        # A message longer than the limit of the decoder raises ValueError, which closes the connection
+        try:
+            msgs = decoder.feed(msg_bytes)
+        except ValueError as e:
+            print(f"{e}. Closing the connection of client {client_address}")
+            break
+
+        answers = []
+        for msg in msgs:
+
+            # A batch (see protocol.py) is calculated in one go, and answered with a batch of replies in the same order
+            if isinstance(msg, list):
+                print(f"Recived a batch of {len(msg)} expressions from client {client_address}")
+                answers.append([calculate(expression) for expression in msg])
+                print(f"Sending a batch of {len(msg)} answers to the client {client_address}\n")
+                continue
+
+            print (f"Recived expression {msg} from client {client_address}")
+
+            # Calculating the value of the received expression with the safe calculator (see evaluator.py)
+            # It returns an error message for an invalid expression, or one which is too large to calculate
+            ans = calculate(msg)
+            print(f"Sending answer {ans} to the client {client_address}\n")
+            answers.append(ans)
+
+        # Sending the replies to all the messages of this recv to the client at once
+        if answers:
+            client_connection.sendall(encode_messages(answers))
+
+def worker():
+
+    # Using the global clients_connected variable
+    global clients_connected
+
+    # Every worker serves one client at a time, taking the next one from the queue. None means the server is stopping
+    while True:
+        client = pending_clients.get()
+        if client is None:
+            break
+        client_connection, client_address = client
+
+        with clients_lock:
+            active_clients.add(client_connection)
+            stop = shutting_down
         try:
-            ans = eval(msg)
-        except:
-            ans = "ERROR: Invalid expression"
-        ans = str(ans)
-        print(f"Sending answer {ans} to the client {client_address}\n")
-
-        # Sending the reply to the client, and storing the length of the message sent
-        lenth = client_connection.sendall(bytes(ans, "utf-8"))
-
-print(f"Listening on {server_ip} port {server_port}")
-
-while True:
-    
-    # Waiting to accept a connection from a client. This line blocks the code until a client connection is made
-    # After a client connects, a new socket is assigned to this connection (client_conn)
-    # The server socket is always reserved to listen for incoming connections
-    client_conn, client_addr = server_socket.accept()
-
-    clients_connected += 1 # increasing the count of number of clients by one, after a client has connected
-    
-    print(f"\nConnected to client {client_addr}")
-    print(f"{clients_connected} clients currently connected\n") # Displaying the count of clients connected
-
-    # Starting a new thread for every client connected. 
-    # All the clients will thus, access the server in parallel and independent to each other
-    start_new_thread(calc, (client_conn, client_addr,))
-
-server_socket.close()
+            if not stop:
+                calc(client_connection, client_address)
+        except OSError as e:
+            print(f"Error encountered. Closing the connection of client {client_address} ({e})")
+        finally:
+            with clients_lock:
+                active_clients.discard(client_connection)
+                clients_connected -= 1
+                count = clients_connected
+            client_connection.close()
+            print(f"{count} clients currently connected\n")
+
+workers = [threading.Thread(target=worker) for i in range(pool_size)]
+for thread in workers:
+    thread.start()
+
+print(f"Listening on {server_ip} port {server_port} with {pool_size} workers")
+
+try:
+    while True:
+
+        # Waiting to accept a connection from a client. This line blocks the code until a client connection is made
+        # After a client connects, a new socket is assigned to this connection (client_conn)
+        # The server socket is always reserved to listen for incoming connections
+        client_conn, client_addr = server_socket.accept()
+
+        # Handing the client over to the pool. If all the workers are busy and the queue is full, the client is refused
+        try:
+            with clients_lock:
+                pending_clients.put_nowait((client_conn, client_addr))
+                clients_connected += 1 # increasing the count of number of clients by one, after a client has connected
+                count = clients_connected
+        except queue.Full:
+            print(f"\nServer busy, refusing client {client_addr}")
+            try:
+                client_conn.sendall(encode_message("ERROR: Server busy"))
+            except OSError:
+                pass
+            client_conn.close()
+            continue
+
+        print(f"\nConnected to client {client_addr}")
+        print(f"{count} clients currently connected\n") # Displaying the count of clients connected
+
+# Clean shutdown with Ctrl+C: no new clients are accepted, the waiting clients are disconnected, the clients
+# being served are shut down so that their workers return from recv, and all the workers are joined
+except KeyboardInterrupt:
+    print("\nShutting down the server")
+
+finally:
+    server_socket.close()
+    with clients_lock:
+        shutting_down = True
+        for client_conn in active_clients:
+            try:
+                client_conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+    for thread in workers:
+        pending_clients.put(None)
+    for thread in workers:
+        thread.join()
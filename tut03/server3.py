@@ -1,7 +1,11 @@
 import socket
 import sys
-import queue
 import select
+import time
+
+from evaluator import calculate
+from protocol import FrameDecoder, encode_messages
+from timers import TimerHeap
 
 # Creating server socket
 server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -25,13 +29,51 @@ input_sockets = [server_socket]
 # Contains a list of sockets which have messages pending to be sent to their connected clients
 output_sockets = []
 
-# Contains a dictionary, which maintains message queues for each socket.
-# The queues contain the messages which are to be sent to the client
-socket_msgs = {}
+# Contains a dictionary, which maintains an outgoing buffer (a bytearray) for each socket
+# The replies are added to the end of the buffer, and every send takes as many bytes from its start as the
+# socket accepts. The socket is non-blocking, so a client which reads slowly never stalls the other clients
+# Sending a bytearray does not copy it, and deleting the bytes sent from its start is cheap
+socket_buffers = {}
+
+# A client whose buffer grows above HIGH_WATER_MARK bytes is not read from (and so gets no new replies) until its
+# buffer is back below LOW_WATER_MARK bytes. This bounds the memory used for a client which sends but does not read
+HIGH_WATER_MARK = 256 * 1024
+LOW_WATER_MARK = 64 * 1024
+
+# Contains a dictionary, which maintains a FrameDecoder for each socket (see protocol.py)
+# It splits the data received from the client into messages, keeping a message which has not fully arrived yet
+socket_decoders = {}
+
+# Contains a dictionary with the address of the client of each socket
+socket_addrs = {}
+
+# Contains the deadlines of the clients (see timers.py, and FrameDecoder.deadline in protocol.py)
+# select waits no longer than the next deadline, and the clients whose deadline has passed are disconnected
+socket_timers = TimerHeap()
+
+# Counts of the clients disconnected for staying idle, and for taking too long to finish a message
+idle_evictions = 0
+read_evictions = 0
 
 # Maintains a count of the number of clients connected
 clients_connected = 0
 
+def close_connection(sckt):
+
+    # Removes the client from all the lists and dictionaries, and closes its connection
+    global clients_connected
+    if sckt in input_sockets:
+        input_sockets.remove(sckt)
+    if sckt in output_sockets:
+        output_sockets.remove(sckt)
+    del socket_buffers[sckt]
+    del socket_decoders[sckt]
+    del socket_addrs[sckt]
+    socket_timers.remove(sckt)
+    sckt.close()
+    clients_connected -= 1
+    print(f"{clients_connected} clients currently connected\n")
+
 # In each iteration, the server will perform some operations. It will send data to some clients, receive data
 # from some clients and close the connections of some. Now, which operation to perform on which client is 
 # decided by the select module. It provides asynchronous I/O on multiple file descriptors
@@ -40,9 +82,11 @@ while input_sockets:
     # Select takes input, the sockets to which clients are connected, the input and output sockets separately
     # It will return 3 lists: 
     # 1. The sockets to read from - We will receive data from the client connected to this socket
-    # 2. The sockets to write to - We will send data from the socket mesasge queue to the client connected
+    # 2. The sockets to write to - We will send data from the socket buffer to the client connected
     # 3. The sockets which gave an error - Close the connection
-    read_sockets, write_sockets, err_sockets = select.select(input_sockets, output_sockets, input_sockets)
+    # The last argument is the timeout: select returns when the next client's deadline comes, even if nothing happened
+    read_sockets, write_sockets, err_sockets = select.select(input_sockets, output_sockets, input_sockets, socket_timers.timeout(time.monotonic()))
+    now = time.monotonic()
     
     # Receiving data from the sockets in the Read list
     for sckt in read_sockets:
@@ -50,73 +94,114 @@ while input_sockets:
         # If socket is the server socket, then reading it means listening for new connections and accepting it
         if sckt is server_socket:
             client_conn, client_addr = server_socket.accept()
+            client_conn.setblocking(0)
             clients_connected += 1
             print(f"\nConnected to client {client_addr}")
             print(f"{clients_connected} clients currently connected\n")
 
             input_sockets.append(client_conn) # adding the cilent to input list
-            socket_msgs[client_conn] = queue.Queue() # creating its message queue
+            socket_buffers[client_conn] = bytearray() # creating its outgoing buffer
+            socket_decoders[client_conn] = FrameDecoder()
+            socket_addrs[client_conn] = client_addr
+            socket_timers.set(client_conn, socket_decoders[client_conn].deadline(now))
 
         # If not server socket, then it is a client socket which has data to be received
         else:
-            msg_bytes = sckt.recv(1024)
-            
+            client_addr = socket_addrs[sckt]
+            try:
+                msg_bytes = sckt.recv(4096)
+            except BlockingIOError:
+                continue
+            except OSError:
+                msg_bytes = b''
+
+            # The data can hold part of a message, or several messages. A message longer than the limit
+            # of the decoder raises ValueError, and the connection is closed like a closed connection
+            try:
+                msgs = socket_decoders[sckt].feed(msg_bytes)
+            except ValueError as e:
+                print(e)
+                msg_bytes = b''
+
             # If data is 0, the client has closed the connection. We remove the client from all the lists
             if msg_bytes == b'':
-                client_addr = sckt.getpeername() # Getting the IP address and port of the client
                 print(f"Closing the connection of client {client_addr}")
-                if sckt in output_sockets:
-                    output_sockets.remove(sckt)
-                input_sockets.remove(sckt)
-                del socket_msgs[sckt]
-                sckt.close()
-                clients_connected -= 1
-                print(f"{clients_connected} clients currently connected\n")
-
-            # If data is not 0, then decode the message, which is in bytes, to string
+                close_connection(sckt)
+
+            # If data is not 0, then answer every complete message received, and move the client's deadline
             else:
-                msg = msg_bytes.decode()
-                client_addr = sckt.getpeername()
-                print (f"Recived expression '{msg}' from client {client_addr}")
-
-                # Calculating the given expression using eval()
-                try:
-                    ans = eval(msg)
-                except:
-                    ans = "ERROR: Invalid expression"   
-                ans = str(ans)
-
-                # Put the message in the socket's message queue
-                socket_msgs[sckt].put(ans)
-                
-                # Put the socket in output list, since it has a message to be sent
-                if sckt not in output_sockets:
-                    output_sockets.append(sckt)
-
-    # For sockets to be written, extract the mesasge from message queue and send it
+                socket_timers.set(sckt, socket_decoders[sckt].deadline(now))
+                answers = []
+                for msg in msgs:
+
+                    # A batch (see protocol.py) is calculated in one go, and answered with a batch of replies in the same order
+                    if isinstance(msg, list):
+                        print(f"Recived a batch of {len(msg)} expressions from client {client_addr}")
+                        answers.append([calculate(expression) for expression in msg])
+                        print(f"Sending a batch of {len(msg)} answers to client {client_addr}\n")
+                        continue
+
+                    print (f"Recived expression '{msg}' from client {client_addr}")
+
+                    # Calculating the given expression with the safe calculator (see evaluator.py)
+                    ans = calculate(msg)
+                    answers.append(ans)
+                    print(f"Sending answer '{ans}' to client {client_addr}\n")
+
+                # Add the replies to the socket's buffer
+                if answers:
+                    socket_buffers[sckt] += encode_messages(answers)
+
+                    # Put the socket in output list, since it has a message to be sent
+                    if sckt not in output_sockets:
+                        output_sockets.append(sckt)
+
+                    # Stop reading from the client while its buffer is too full
+                    if len(socket_buffers[sckt]) > HIGH_WATER_MARK:
+                        input_sockets.remove(sckt)
+
+    # For sockets to be written, send as much of the buffer as the socket accepts without blocking
     for sckt in write_sockets:
+
+        # The socket may have been closed while reading
+        if sckt not in socket_buffers:
+            continue
+        buffer = socket_buffers[sckt]
         try:
-            ans = socket_msgs[sckt].get_nowait()
-        
-        # If nothing in message queue, remove the socket from output list, since it contains nothing to be sent anymore
-        except queue.Empty:
+            sent = sckt.send(buffer)
+        except BlockingIOError:
+            continue
+        except OSError:
+            print(f"Error encountered. Closing the connection of client {socket_addrs[sckt]}")
+            close_connection(sckt)
+            continue
+        del buffer[:sent]
+
+        # If the buffer is empty, remove the socket from output list, since it contains nothing to be sent anymore
+        if not buffer:
             output_sockets.remove(sckt)
-        else:
-            sckt.sendall(bytes(ans, "utf-8"))
-            client_addr = sckt.getpeername()
-            print(f"Sending answer '{ans}' to client {client_addr}\n")
+
+        # Read from the client again once its buffer has drained
+        if len(buffer) < LOW_WATER_MARK and sckt not in input_sockets:
+            input_sockets.append(sckt)
 
     # For sockets which encountered error, we remove them from all the lists and close the connection
     for sckt in err_sockets:
-        client_addr = sckt.getpeername()
-        print(f"Error encountered. Closing the connection of client {client_addr}")
-        input_sockets.remove(sckt)
-        if sckt in output_sockets:
-            output_sockets.remove(sckt)
-        del socket_msgs[sckt]
-        sckt.close()
-        clients_connected -= 1
-        print(f"{clients_connected} clients currently connected\n")
+        if sckt not in socket_buffers:
+            continue
+        print(f"Error encountered. Closing the connection of client {socket_addrs[sckt]}")
+        close_connection(sckt)
+
+    # Closing the connections of the clients whose deadline has passed. Only these clients are looked at
+    for sckt in socket_timers.expired(now):
+        if socket_decoders[sckt].partial():
+            read_evictions += 1
+            print(f"\nClient {socket_addrs[sckt]} took too long to finish its message. Closing its connection")
+        else:
+            idle_evictions += 1
+            print(f"\nClient {socket_addrs[sckt]} was idle for too long. Closing its connection")
+        print(f"Clients disconnected: {idle_evictions} idle, {read_evictions} too slow")
+        close_connection(sckt)
 
 server_socket.close()
 
@@ -0,0 +1,160 @@
+import asyncio
+import sys
+
+from evaluator import calculate
+from protocol import FrameDecoder, encode_messages
+
+# Usage: python server5.py <ip> <port> [calc|echo]
+# The third, optional, argument is the behaviour of the server: "calc" (the default) calculates the expressions
+# like server1, server2 and server3, "echo" sends the messages back like server4
+# The command line is only read when the file is run, so that server6 can import the server for its worker processes
+mode = "calc"
+
+# Unlike server3 and server4, which call select.select over lists of sockets, this server runs on asyncio
+# The event loop waits on all the sockets with epoll (kqueue on macOS), so the cost of an event does not grow with
+# the number of connected clients and there is no limit of 1024 sockets. Every client is served by its own coroutine
+
+# Maintains a count of the number of clients connected, of all the connections accepted, of all the requests
+# answered, and of the clients disconnected for staying idle or for taking too long to finish a message
+# Only the event loop thread changes them, so no lock is needed
+clients_connected = 0
+connections_accepted = 0
+requests_served = 0
+idle_evictions = 0
+read_evictions = 0
+
+def reply(msg):
+
+    # Echo mode sends the message back as it is
+    if mode == "echo":
+        return str(msg)
+
+    # Calculating the given expression with the safe calculator (see evaluator.py)
+    return calculate(msg)
+
+def evict(writer, decoder, client_addr):
+
+    # Called by the event loop when the client's deadline (see FrameDecoder.deadline in protocol.py) passes
+    # Aborting the connection ends the read (or the drain) the client's coroutine is waiting on
+    global idle_evictions, read_evictions
+    if decoder.partial():
+        read_evictions += 1
+        print(f"\nClient {client_addr} took too long to finish its message. Closing its connection")
+    else:
+        idle_evictions += 1
+        print(f"\nClient {client_addr} was idle for too long. Closing its connection")
+    print(f"Clients disconnected: {idle_evictions} idle, {read_evictions} too slow")
+    writer.transport.abort()
+
+async def serve_client(reader, writer):
+
+    # Using the global counters
+    global clients_connected, connections_accepted, requests_served
+
+    client_addr = writer.get_extra_info("peername")
+    clients_connected += 1
+    connections_accepted += 1
+    print(f"\nConnected to client {client_addr}")
+    print(f"{clients_connected} clients currently connected\n")
+
+    # Splits the received bytes into newline terminated messages (see protocol.py)
+    decoder = FrameDecoder()
+
+    # The client's deadline is a timer of the event loop, which keeps its timers in a heap. It is moved after every
+    # read, which is cheaper than a wait_for (a new task) around every read
+    loop = asyncio.get_running_loop()
+    timer = loop.call_at(decoder.deadline(loop.time()), evict, writer, decoder, client_addr)
+
+    try:
+        while True:
+
+            # Waiting for data from the client. Other clients are served while this coroutine waits
+            # The data can hold part of a message, or several messages
+            msg_bytes = await reader.read(65536)
+
+            # If data is 0, the client has closed the connection
+            if msg_bytes == b'':
+                print(f"Closing the connection of client {client_addr}")
+                break
+
+            # Moving the client's deadline
+            msgs = decoder.feed(msg_bytes)
+            timer.cancel()
+            timer = loop.call_at(decoder.deadline(loop.time()), evict, writer, decoder, client_addr)
+
+            answers = []
+            requests = 0
+            for msg in msgs:
+
+                # A batch (see protocol.py) is answered in one go, with a batch of replies in the same order
+                # Every message of the batch counts as a request
+                if isinstance(msg, list):
+                    print(f"Recived a batch of {len(msg)} messages from client {client_addr}")
+                    answers.append([reply(m) for m in msg])
+                    print(f"Sending a batch of {len(msg)} answers to client {client_addr}\n")
+                    requests += len(msg)
+                    continue
+
+                print (f"Recived expression '{msg}' from client {client_addr}")
+                answers.append(reply(msg))
+                print(f"Sending answer '{answers[-1]}' to client {client_addr}\n")
+                requests += 1
+
+            # The replies go to the writer's buffer and are sent as the socket becomes writable
+            # drain() only waits when the buffer is above its high-water mark, i.e. when the client reads too slowly
+            # A client which stops reading sends nothing more either, so its deadline ends the wait
+            if answers:
+                requests_served += requests
+                writer.write(encode_messages(answers))
+                await writer.drain()
+
+    # For clients which encountered an error, or sent a message longer than the limit, the connection is closed
+    except (ConnectionError, OSError, ValueError):
+        print(f"Error encountered. Closing the connection of client {client_addr}")
+
+    # When the server is stopped with Ctrl+C, the coroutines of the connected clients are cancelled
+    # The cancellation ends the coroutine normally, which closes the connection below
+    except asyncio.CancelledError:
+        print(f"Server stopping. Closing the connection of client {client_addr}")
+
+    finally:
+        timer.cancel()
+        writer.close()
+        clients_connected -= 1
+        print(f"{clients_connected} clients currently connected\n")
+
+def raise_open_file_limit():
+
+    # Every client uses a file descriptor. The soft limit (often 1024) is raised to the hard limit
+    # so that tens of thousands of clients can stay connected. Not available on Windows
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+async def start_server(server_ip, server_port, reuse_port=False):
+
+    # With reuse_port=True several processes can listen on the same port (SO_REUSEPORT), see server6
+    return await asyncio.start_server(serve_client, server_ip, server_port, backlog=1024, reuse_port=reuse_port)
+
+async def main(server_ip, server_port):
+    server = await start_server(server_ip, server_port)
+    print(f"Listening on {server_ip} port {server_port} ({mode} mode)")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+
+    # Taking the server IP address and port number as command line arguments
+    server_ip = sys.argv[1]
+    server_port = int(sys.argv[2])
+    mode = sys.argv[3] if len(sys.argv) > 3 else "calc"
+    raise_open_file_limit()
+
+    # The server will always keep running, unless force quit using Ctrl+C
+    try:
+        asyncio.run(main(server_ip, server_port))
+    except KeyboardInterrupt:
+        print("\nShutting down the server")
@@ -0,0 +1,129 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+import server5
+
+# Pre-fork version of server5, to use all the cores of the machine
+# The calculations are CPU work, so the threads of server2 cannot run them in parallel (the GIL). Here a supervisor
+# process starts a number of worker processes. Every worker opens its own listening socket on the same port with
+# SO_REUSEPORT, and the kernel spreads the new connections over the workers. Each worker runs the asyncio server of
+# server5. The supervisor restarts the workers which crash, and prints the counters of all the workers together
+#
+# Usage: python server6.py <ip> <port> [workers] [calc|echo]
+# The number of workers is the number of cores by default
+
+# Seconds between two reports of the counters by the supervisor
+REPORT_INTERVAL = 5
+
+# Counters of every worker, in shared memory: connections accepted, clients connected, requests answered, and
+# clients disconnected by their timeout (see server5). Each worker only writes its own counters, so no lock is needed
+COUNTERS = 4
+
+async def run_worker(index, server_ip, server_port, counters, supervisor):
+    server = await server5.start_server(server_ip, server_port, reuse_port=True)
+
+    # A restarted worker adds its counts to those of the worker it replaces
+    connections_base = counters[COUNTERS * index]
+    requests_base = counters[COUNTERS * index + 2]
+    evictions_base = counters[COUNTERS * index + 3]
+    async with server:
+        serving = asyncio.ensure_future(server.serve_forever())
+        while not serving.done():
+
+            # A worker whose supervisor is gone (it was killed, or crashed) stops, instead of serving the port
+            # without anyone to restart or stop it
+            if os.getppid() != supervisor:
+                serving.cancel()
+                break
+            counters[COUNTERS * index] = connections_base + server5.connections_accepted
+            counters[COUNTERS * index + 1] = server5.clients_connected
+            counters[COUNTERS * index + 2] = requests_base + server5.requests_served
+            counters[COUNTERS * index + 3] = evictions_base + server5.idle_evictions + server5.read_evictions
+            await asyncio.sleep(0.5)
+
+def worker(index, server_ip, server_port, mode, counters, supervisor):
+
+    # The workers print nothing, a line for every request from every worker would take longer than the calculations
+    # Ctrl+C is handled by the supervisor, which stops the workers with SIGTERM (its own handler is not inherited)
+    sys.stdout = open(os.devnull, "w")
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server5.mode = mode
+    server5.raise_open_file_limit()
+    asyncio.run(run_worker(index, server_ip, server_port, counters, supervisor))
+
+def start_worker(index, server_ip, server_port, mode, counters):
+    process = multiprocessing.Process(target=worker, args=(index, server_ip, server_port, mode, counters, os.getpid()), daemon=True)
+    process.start()
+    return process
+
+def report(processes, counters, restarts, elapsed, last_requests):
+
+    # Prints the totals of all the workers and the requests of each one. Returns the total number of requests
+    connections = sum(counters[COUNTERS * i] for i in range(len(processes)))
+    connected = sum(counters[COUNTERS * i + 1] for i in range(len(processes)))
+    requests = [counters[COUNTERS * i + 2] for i in range(len(processes))]
+    evictions = sum(counters[COUNTERS * i + 3] for i in range(len(processes)))
+    alive = sum(1 for process in processes if process.is_alive())
+    rate = (sum(requests) - last_requests) / elapsed if elapsed > 0 else 0
+    print(f"{alive} workers alive, {restarts} restarts | {connected} clients connected, {connections} connections, {evictions} timed out | "
+          f"{sum(requests)} requests ({rate:.0f} requests/s) | per worker: {requests}")
+    return sum(requests)
+
+if __name__ == "__main__":
+
+    # Taking the server IP address and port number as command line arguments
+    server_ip = sys.argv[1]
+    server_port = int(sys.argv[2])
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+    mode = sys.argv[4] if len(sys.argv) > 4 else "calc"
+
+    if not hasattr(socket, "SO_REUSEPORT"):
+        print("SO_REUSEPORT is not available on this system, use server5 instead")
+        exit(1)
+
+    # Stopping the supervisor with kill (SIGTERM), or from a service manager, stops the workers like Ctrl+C does
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+
+    counters = multiprocessing.Array("q", COUNTERS * workers, lock=False)
+    processes = [start_worker(i, server_ip, server_port, mode, counters) for i in range(workers)]
+    print(f"Listening on {server_ip} port {server_port} with {workers} worker processes ({mode} mode)")
+
+    restarts = 0
+    last_report = time.perf_counter()
+    last_requests = 0
+    try:
+        while True:
+            time.sleep(1)
+
+            # A worker which exited (it crashed, or was killed) is replaced by a new one. At most one restart
+            # per worker every second, so a worker which cannot start does not keep the machine busy
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"Worker {i} (pid {process.pid}) exited with code {process.exitcode}, restarting it")
+                    counters[COUNTERS * i + 1] = 0
+                    processes[i] = start_worker(i, server_ip, server_port, mode, counters)
+                    restarts += 1
+
+            now = time.perf_counter()
+            if now - last_report >= REPORT_INTERVAL:
+                last_requests = report(processes, counters, restarts, now - last_report, last_requests)
+                last_report = now
+
+    # Stopping the server with Ctrl+C (or SIGTERM) stops all the workers
+    except KeyboardInterrupt:
+        print("\nShutting down the server")
+
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        report(processes, counters, restarts, time.perf_counter() - last_report, last_requests)
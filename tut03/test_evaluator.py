@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+
+from evaluator import (MAX_EXPRESSION_LENGTH, MAX_NODES, ExpressionError, ExpressionTooLarge, calculate,
+    evaluate)
+
+
+def test_arithmetic():
+    assert calculate("1 + 2*3") == "7"
+    assert calculate("(1+2)*3") == "9"
+    assert calculate("7 // 2") == "3"
+    assert calculate("-7 % 3") == "2"
+    assert calculate("2**0.5") == "1.4142135623730951"
+    assert calculate("~5 ^ 3 | 1 << 4 & 255 >> 2") == str(~5 ^ 3 | 1 << 4 & 255 >> 2)
+
+
+def test_refuses_anything_but_arithmetic():
+    # Names, calls, strings and other Python code are not calculated
+    for expression in ["__import__('os')", "'a'*3", "x + 1", "[1, 2]", "1 if 1 else 2", "1 < 2", "", "1 +"]:
+        with pytest.raises(ExpressionError) as e:
+            evaluate(expression)
+        assert not isinstance(e.value, ExpressionTooLarge)
+        assert calculate(expression) == "ERROR: Invalid expression"
+
+
+def test_refuses_arithmetic_errors():
+    # A negative number to a fractional power would be complex, and only real answers are given
+    for expression in ["1/0", "1//0", "1%0", "1.0/0", "10.0**400", "(-8)**0.5", "(-8)**(1/3)", "~1.5", "1 << -1"]:
+        assert calculate(expression) == "ERROR: Invalid expression"
+
+
+def test_refuses_results_over_the_size_limit():
+    # Each of these would take a long time or a lot of memory to calculate, and is refused before it is
+    for expression in ["9**9**9", "10**3000*10**3000", "1<<100000", "2**100000", "(10**3000)**4"]:
+        with pytest.raises(ExpressionTooLarge):
+            evaluate(expression)
+        assert calculate(expression) == "ERROR: Result too large"
+    assert calculate("10**3000") == str(10**3000)
+
+
+def test_refuses_expressions_over_the_length_limits():
+    assert calculate("1" * MAX_EXPRESSION_LENGTH) == str(int("1" * MAX_EXPRESSION_LENGTH))
+    assert calculate("1" * (MAX_EXPRESSION_LENGTH + 1)) == "ERROR: Expression too long"
+
+    # Short enough, but with more than MAX_NODES numbers and operators
+    expression = "+".join(["1"] * MAX_NODES)
+    assert len(expression) <= MAX_EXPRESSION_LENGTH
+    assert calculate(expression) == "ERROR: Expression too long"
+    assert calculate("+".join(["1"] * (MAX_NODES // 3))) == str(MAX_NODES // 3)
@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+
+from loadgen import percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    for p in range(1, 101):
+        assert percentile(values, p) == p
+    assert percentile(values, 0) == 1
+    assert percentile(values, 99.5) == 100
+
+    # With few values a high percentile is the largest value, not one below it
+    assert percentile([10, 20, 30, 40], 50) == 20
+    assert percentile([10, 20, 30, 40], 51) == 30
+    assert percentile([10, 20, 30, 40], 95) == 40
+    assert percentile([10, 20, 30, 40], 99) == 40
+    assert percentile([5], 50) == 5
+    assert percentile([], 99) == 0.0
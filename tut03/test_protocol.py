@@ -0,0 +1,116 @@
+import os
+import socket
+import sys
+
+import pytest
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+
+from protocol import (IDLE_TIMEOUT, MAX_BATCH_BYTES, MAX_BATCH_SIZE, READ_TIMEOUT, FrameDecoder, encode_messages,
+    recv_message)
+
+
+def feed_all(decoder, chunks):
+    msgs = []
+    for chunk in chunks:
+        msgs.extend(decoder.feed(chunk))
+    return msgs
+
+
+def test_message_split_across_reads():
+    data = encode_messages(["12*(3+4)", "2**64"])
+    for size in [1, 2, 3, 5, 7]:
+        decoder = FrameDecoder()
+        chunks = [data[i:i + size] for i in range(0, len(data), size)]
+        assert feed_all(decoder, chunks) == ["12*(3+4)", "2**64"]
+        assert not decoder.partial()
+
+
+def test_several_messages_per_read():
+    decoder = FrameDecoder()
+    assert decoder.feed(b"1+1\n2+2\n3+") == ["1+1", "2+2"]
+    assert decoder.partial()
+    assert decoder.feed(b"3\n\n") == ["3+3", ""]
+    assert not decoder.partial()
+
+
+def test_crlf_line_endings():
+    # Terminals and telnet end their lines with \r\n, also when the \r and the \n arrive in different reads
+    decoder = FrameDecoder()
+    assert decoder.feed(b"1+1\r\n2+2\r") == ["1+1"]
+    assert decoder.feed(b"\n") == ["2+2"]
+
+
+def test_message_over_the_size_limit():
+    decoder = FrameDecoder(max_size=8)
+    assert decoder.feed(b"12345678\n") == ["12345678"]
+    decoder.feed(b"1234")
+    with pytest.raises(ValueError):
+        decoder.feed(b"56789")
+
+    # A whole message longer than the limit is only refused while it has no newline
+    assert FrameDecoder(max_size=8).feed(b"x" * 20 + b"\n") == ["x" * 20]
+    with pytest.raises(ValueError):
+        FrameDecoder(max_size=8).feed(b"1\n" + b"x" * 9)
+
+
+def test_batch_across_reads():
+    decoder = FrameDecoder()
+    assert decoder.feed(b"1+1\nBATCH 3\n2+2\n3") == ["1+1"]
+    assert decoder.partial()
+    assert decoder.feed(b"+3\n") == []
+    assert decoder.partial()
+    assert decoder.feed(b"4+4\n5+5\n") == [["2+2", "3+3", "4+4"], "5+5"]
+    assert not decoder.partial()
+
+    # An empty batch is complete as soon as its header arrives
+    assert decoder.feed(b"BATCH 0\nBATCH 0\n6+6\n") == [[], [], "6+6"]
+
+    # The replies of the server are read back the same way
+    data = encode_messages(["1", ["2", "3"], [], "4"])
+    assert feed_all(FrameDecoder(), [data[i:i + 3] for i in range(0, len(data), 3)]) == ["1", ["2", "3"], [], "4"]
+
+
+def test_invalid_batch_headers_are_messages():
+    decoder = FrameDecoder()
+    headers = ["BATCH", "BATCH x", "BATCH -1", "BATCH \uff13", "BATCH " + str(MAX_BATCH_SIZE + 1), "batch 1"]
+    assert decoder.feed("".join(header + "\n" for header in headers).encode()) == headers
+    assert not decoder.partial()
+
+
+def test_batch_over_the_size_limit():
+    decoder = FrameDecoder()
+    decoder.feed(b"BATCH 100\n")
+    with pytest.raises(ValueError):
+        for i in range(100):
+            decoder.feed(b"x" * (MAX_BATCH_BYTES // 50) + b"\n")
+
+
+def test_deadline():
+    # An idle client gets IDLE_TIMEOUT, a client which started a message READ_TIMEOUT from its first bytes
+    decoder = FrameDecoder()
+    assert decoder.deadline(100) == 100 + IDLE_TIMEOUT
+    decoder.feed(b"1+")
+    assert decoder.deadline(110) == 110 + READ_TIMEOUT
+    decoder.feed(b"1")
+    assert decoder.deadline(120) == 110 + READ_TIMEOUT
+    decoder.feed(b"\nBATCH 2\n1\n")
+    assert decoder.deadline(130) == 130 + READ_TIMEOUT
+    decoder.feed(b"2\n")
+    assert decoder.deadline(140) == 140 + IDLE_TIMEOUT
+
+
+def test_recv_message():
+    a, b = socket.socketpair()
+    try:
+        decoder = FrameDecoder()
+        a.sendall(b"1+1\nBATCH 2\n2\n3\n4")
+        assert recv_message(b, decoder) == "1+1"
+        assert recv_message(b, decoder) == ["2", "3"]
+        a.sendall(b"\n")
+        a.close()
+        assert recv_message(b, decoder) == "4"
+        assert recv_message(b, decoder) is None
+    finally:
+        a.close()
+        b.close()
@@ -0,0 +1,69 @@
+import heapq
+import itertools
+
+# Deadlines of the client connections of the select servers (server3 and server4), to close the idle ones
+# The deadlines are kept in a heap, so the next one to expire is always at its top: the server asks the heap how long
+# select may wait, and after select returns it only looks at the deadlines which have passed. Nothing is done for the
+# connections which have not expired, so the cost does not grow with the number of clients
+# A connection's deadline moves every time it receives data. Moving it only updates a dictionary: the entry of the
+# connection in the heap stays where it is, and when it reaches the top it is put back with the current deadline.
+# A busy connection therefore costs nothing per message, and at most one heap operation per timeout period
+
+class TimerHeap:
+
+    def __init__(self):
+
+        # The current deadline of every key, and the (deadline, sequence number) of its entry in the heap
+        # An entry of the heap which does not match the key's entry any more is skipped when it reaches the top
+        self.deadlines = {}
+        self.entries = {}
+        self.heap = []
+
+        # The sequence numbers also order entries with the same deadline, since sockets cannot be compared
+        self.sequence = itertools.count()
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def set(self, key, deadline):
+
+        # Sets (or moves) the deadline of the key. A new entry is only needed if the deadline moves earlier than
+        # the entry the key already has in the heap
+        self.deadlines[key] = deadline
+        entry = self.entries.get(key)
+        if entry is None or deadline < entry[0]:
+            self.push(key, deadline)
+
+    def push(self, key, deadline):
+        entry = (deadline, next(self.sequence))
+        self.entries[key] = entry
+        heapq.heappush(self.heap, (*entry, key))
+
+    def remove(self, key):
+        self.deadlines.pop(key, None)
+        self.entries.pop(key, None)
+
+    def timeout(self, now):
+
+        # Seconds until the next deadline, to wait in select, or None if there is no deadline
+        # The top entry may have been moved later, in which case select returns early and expired() puts it back
+        while self.heap and self.entries.get(self.heap[0][2]) != self.heap[0][:2]:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return None
+        return max(self.heap[0][0] - now, 0)
+
+    def expired(self, now):
+
+        # Removes and returns the keys whose deadline has passed
+        keys = []
+        while self.heap and self.heap[0][0] <= now:
+            deadline, sequence, key = heapq.heappop(self.heap)
+            if self.entries.get(key) != (deadline, sequence):
+                continue
+            if self.deadlines[key] > now:
+                self.push(key, self.deadlines[key])
+                continue
+            self.remove(key)
+            keys.append(key)
+        return keys
@@ -0,0 +1,168 @@
+#Benchmark of the octant pipelines of tut02 and tut07 on synthetic data
+#
+#python benchmark.py --rows 10000 100000 1000000 --mean-run 5 --output benchmark.json
+#
+#Every stage (ingest, columnar, classification, counting, transitions, longest runs, writing) is timed
+#on its own, best of --repeat runs, and reported in rows per second. The results are appended to the JSON
+#file so that runs of different versions can be compared
+#"ingest" is the conversion of an input workbook to the columnar .octc format (parsing the workbook,
+#classifying the octants and writing the file), it is skipped like "writing" for series too long for a
+#sheet. "columnar" is writing the columns to an .octc file and reading them back
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+import tut07
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","tut02"))
+import tut02
+
+#Largest number of data rows of an excel sheet, the ingest and writing stages are skipped for longer series
+EXCEL_MAX_ROWS=1048575
+
+
+def synthetic_octant_data(rows,mean_run=1.0,seed=0):
+	#Synthetic T, U, V, W series of "rows" samples. U, V and W stay constant for runs of samples whose
+	#lengths are drawn from a geometric distribution with mean "mean_run", so the octant column has
+	#runs of about that length (mean_run=1 gives independent samples)
+	#Returns a dict of float64 arrays
+	rng=np.random.default_rng(seed)
+	lengths=rng.geometric(1.0/max(mean_run,1.0),size=int(rows/max(mean_run,1.0))+16)
+	while(lengths.sum()<rows):
+		lengths=np.concatenate((lengths,rng.geometric(1.0/max(mean_run,1.0),size=len(lengths))))
+	columns={"T":np.round(np.arange(rows)*0.01,2)}
+	for name in ["U","V","W"]:
+		columns[name]=np.round(np.repeat(rng.normal(size=len(lengths)),lengths)[:rows],4)
+	return columns
+
+
+def best_time(stage,repeat):
+	#Runs stage() "repeat" times and returns (smallest time in seconds, result of the last run)
+	best=None
+	for i in range(repeat):
+		start=time.perf_counter()
+		result=stage()
+		elapsed=time.perf_counter()-start
+		best=elapsed if best is None else min(best,elapsed)
+	return best,result
+
+
+def benchmark_tut07(columns,mod,repeat,folder):
+	import pandas as pd
+	rows=len(columns["T"])
+	times={}
+	octcfile=os.path.join(folder,"tut07.octc")
+
+	#the input workbook is written once, only its ingestion is timed
+	if(rows<=EXCEL_MAX_ROWS):
+		inputfile=os.path.join(folder,"tut07_input.xlsx")
+		pd.DataFrame({name:columns[name] for name in ["T","U","V","W"]}).to_excel(inputfile,index=False)
+		times["ingest"],ingested=best_time(lambda: tut07.ingest_octant_input(inputfile,os.path.join(folder,"tut07_input.octc")),repeat)
+
+	def columnar():
+		write_columnar_octants=dict(columns)
+		write_columnar_octants["Octant"]=np.zeros(rows,dtype=np.int8)
+		tut07.write_columnar(octcfile,write_columnar_octants)
+		return {name:np.array(array) for name,array in tut07.read_columnar(octcfile).items()}
+	times["columnar"],stored=best_time(columnar,repeat)
+
+	def classification():
+		flucts=[tut07.octant_fluctuations(stored[name])[1] for name in ["U","V","W"]]
+		return tut07.octant_classify(*flucts)
+	times["classification"],octants=best_time(classification,repeat)
+
+	def counting():
+		windowcounts=tut07.octant_window_counts(octants,mod)
+		return tut07.octant_ranks(np.vstack((windowcounts.sum(axis=0),windowcounts)))
+	times["counting"],ranks=best_time(counting,repeat)
+	times["transitions"],transitions=best_time(lambda: tut07.octant_transition_matrix(octants,mod),repeat)
+	times["longest_runs"],runs=best_time(lambda: tut07.octant_longest_runs(octants),repeat)
+
+	if(rows<=EXCEL_MAX_ROWS):
+		data=tut07.octant_columns(pd.DataFrame({name:columns[name] for name in ["T","U","V","W"]}),octants)
+		def writing():
+			report,highlight,boxes=tut07.octant_report(data,mod)
+			tut07.write_octant_workbook(os.path.join(folder,"tut07.xlsx"),data,report,highlight,boxes)
+		times["writing"],result=best_time(writing,repeat)
+	return times
+
+
+def benchmark_tut02(columns,mod,repeat,folder):
+	import pandas as pd
+	rows=len(columns["T"])
+	times={}
+	octcfile=os.path.join(folder,"tut02.octc")
+	deviations={name:columns[name[0]]-columns[name[0]].mean() for name in tut02.INPUT_COLUMNS}
+
+	#the input workbook is written once, only its ingestion is timed
+	if(rows<=EXCEL_MAX_ROWS):
+		inputfile=os.path.join(folder,"tut02_input.xlsx")
+		pd.DataFrame(deviations).to_excel(inputfile,index=False)
+		times["ingest"],ingested=best_time(lambda: tut02.ingest_octant_input(inputfile,os.path.join(folder,"tut02_input.octc")),repeat)
+
+	def columnar():
+		stored=dict(deviations)
+		stored["Octant"]=np.zeros(rows,dtype=np.int8)
+		tut02.write_columnar(octcfile,stored)
+		return {name:np.array(array) for name,array in tut02.read_columnar(octcfile).items()}
+	times["columnar"],stored=best_time(columnar,repeat)
+	times["classification"],octants=best_time(lambda: tut02.octant_classify(*[stored[name] for name in tut02.INPUT_COLUMNS]),repeat)
+	times["counting"],windowcounts=best_time(lambda: tut02.octant_window_counts(octants,mod),repeat)
+	times["transitions"],transitions=best_time(lambda: tut02.octant_transition_matrix(octants,mod),repeat)
+
+	if(rows<=EXCEL_MAX_ROWS):
+		data=pd.DataFrame(deviations)
+		data["Octant"]=tut02.octant_labels(octants)
+		result=tut02.octant_transition_result(octants,mod)
+		times["writing"],written=best_time(lambda: tut02.write_octant_transition_report(result,os.path.join(folder,"tut02.xlsx"),data),repeat)
+	return times
+
+
+def run_benchmarks(rowcounts,mean_run=1.0,mod=5000,repeat=3,tools=("tut02","tut07"),label=""):
+	#Runs the benchmark for every length of rowcounts and returns a list of result dicts
+	results=[]
+	with tempfile.TemporaryDirectory() as folder:
+		for rows in rowcounts:
+			columns=synthetic_octant_data(rows,mean_run)
+			for tool in tools:
+				if(tool=="tut07"):
+					times=benchmark_tut07(columns,mod,repeat,folder)
+				else:
+					times=benchmark_tut02(columns,mod,repeat,folder)
+				stages={stage:{"seconds":seconds,"rows_per_second":rows/seconds if seconds>0 else None} for stage,seconds in times.items()}
+				results.append({"label":label,"tool":tool,"rows":rows,"mean_run":mean_run,"mod":mod,"repeat":repeat,
+					"date":datetime.now().isoformat(timespec="seconds"),"python":platform.python_version(),
+					"numpy":np.__version__,"stages":stages})
+				print(tool+" "+str(rows)+" rows")
+				for stage,timing in stages.items():
+					print("    {:<15}{:>10.4f} s {:>15,.0f} rows/s".format(stage,timing["seconds"],timing["rows_per_second"] or 0))
+	return results
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Benchmark of the octant pipelines on synthetic data")
+	parser.add_argument("--rows", type=int, nargs="+", default=[10000,100000,1000000], help="lengths of the synthetic series (default 10000 100000 1000000)")
+	parser.add_argument("--mean-run", type=float, default=1.0, help="mean length of the runs of equal U, V, W values (default 1)")
+	parser.add_argument("--mod", type=int, default=5000, help="mod value (default 5000)")
+	parser.add_argument("--repeat", type=int, default=3, help="runs of every stage, the best one is reported (default 3)")
+	parser.add_argument("--tool", choices=["tut02","tut07","both"], default="both", help="pipeline to benchmark (default both)")
+	parser.add_argument("--label", default="", help="label stored with the results, e.g. the version being measured")
+	parser.add_argument("--output", help="JSON file the results are appended to")
+	args = parser.parse_args()
+
+	tools=("tut02","tut07") if args.tool=="both" else (args.tool,)
+	results=run_benchmarks(args.rows,args.mean_run,args.mod,args.repeat,tools,args.label)
+	if args.output:
+		previous=[]
+		if os.path.exists(args.output):
+			with open(args.output) as file:
+				previous=json.load(file)
+		with open(args.output,"w") as file:
+			json.dump(previous+results,file,indent=1)
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+
+from tut07 import octant_fluctuations
+
+
+def test_octant_fluctuations_skip_blank_cells():
+	#A blank cell is left out of the mean, as with pandas, and only its own row has no fluctuation
+	values=np.array([1,2,np.nan,-3,4],dtype=np.float64)
+	mean,flucts=octant_fluctuations(values)
+	assert mean==round(pd.Series(values).mean(),3)==1.0
+	assert np.isnan(flucts[2])
+	assert flucts[[0,1,3,4]].tolist()==[0.0,1.0,-4.0,3.0]
+
+
+def test_octant_fluctuations_rounding():
+	#U and U-U Avg are both rounded to 3 decimals, like formatting them with ".3f"
+	mean,flucts=octant_fluctuations(np.array([0.12345,0.23456,0.34567]))
+	assert mean==0.235
+	assert flucts.tolist()==[-0.112,0.0,0.111]
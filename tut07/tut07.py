@@ -1,482 +1,985 @@
 
 from datetime import datetime
 start_time = datetime.now()
+import contextlib
+import cProfile
+import hashlib
+import json
 import os
+import pstats
+import struct
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor,as_completed
+
+import numpy as np
+
+#The eight octant codes, in the order in which they are written in the excel sheet
+OCTANT_CODES=np.array([1,-1,2,-2,3,-3,4,-4],dtype=np.int8)
+
+
+def octant_index(octants):
+	#Position (0 to 7) of each octant code in OCTANT_CODES, i.e. 1->0, -1->1, 2->2 ... -4->7
+	octants=np.asarray(octants)
+	return (2*(np.abs(octants)-1)+(octants<0)).astype(np.intp)
+
+
+#Octant code for every combination of the sign bits (u>0)<<2 | (v>0)<<1 | (w>0)
+SIGN_BITS_TO_OCTANT=np.array([-3,3,-2,2,-4,4,-1,1],dtype=np.int8)
+
+
+def octant_fluctuations(values):
+	#Mean of the column rounded to 3 decimals, and U-U Avg for the whole column where both U and
+	#the difference are rounded to 3 decimals, the same as formatting them with ".3f"
+	#Returns (mean, fluctuations) with the fluctuations as a float64 array
+	#Blank cells (NaN) are left out of the mean like pandas does, so only their own rows have no octant
+	mean=round(float(np.nanmean(values)),3)
+	return mean,np.round(np.round(values,3)-mean,3)
+
+
+def octant_classify(u,v,w):
+	#Octant of every row from the sign bits of the U', V' and W' arrays, computed in one pass
+	#A row where any of them is exactly zero is put in octant 1. Returns an int8 array
+	u=np.asarray(u)
+	v=np.asarray(v)
+	w=np.asarray(w)
+	bits=((u>0).astype(np.intp)<<2)|((v>0).astype(np.intp)<<1)|(w>0).astype(np.intp)
+	octants=SIGN_BITS_TO_OCTANT[bits]
+	octants[(u==0)|(v==0)|(w==0)]=1
+	return octants
+
+
+def octant_runs(octants):
+	#Run length encoding of the octant column in one pass: a new run starts wherever the octant changes
+	#Returns (runvalues, runstarts, runlengths), one entry per run of equal consecutive octants
+	octants=np.asarray(octants)
+	if(len(octants)==0):
+		return octants[:0],np.zeros(0,dtype=np.intp),np.zeros(0,dtype=np.intp)
+	runstarts=np.concatenate(([0],np.flatnonzero(octants[1:]!=octants[:-1])+1))
+	runlengths=np.diff(np.append(runstarts,len(octants)))
+	return octants[runstarts],runstarts,runlengths
+
+
+def octant_longest_runs(octants):
+	#Longest subsequence of every octant from the run table of octant_runs
+	#Returns (large, count, starts) in the order of OCTANT_CODES: large[i] is the longest run length of
+	#the octant (0 if it never occurs), count[i] the number of runs with that length and starts[i] the
+	#array of start indices of those runs
+	runvalues,runstarts,runlengths=octant_runs(octants)
+	runindex=octant_index(runvalues)
+	large=np.zeros(8,dtype=np.intp)
+	np.maximum.at(large,runindex,runlengths)
+	longest=(runlengths==large[runindex])
+	count=np.bincount(runindex[longest],minlength=8)
+	starts=np.split(runstarts[longest][np.argsort(runindex[longest],kind="stable")],np.cumsum(count)[:-1])
+	return large,count,starts
+
+
+octant_name_id_mapping = {"1":"Internal outward interaction", "-1":"External outward interaction", "2":"External Ejection", "-2":"Internal Ejection", "3":"External inward interaction", "-3":"Internal inward interaction", "4":"Internal sweep", "-4":"External sweep"}
+
+def octant_transition_matrix(octants,mod):
+	#Counts the octant transitions (i -> i+1) of every mod range at once
+	#Each consecutive pair is encoded as from*8+to and offset by 64 times the mod range of its "from" value,
+	#so that a single bincount gives all the 8x8 tables. Memory grows with the rows, not with the mod value
+	#A transition belongs to the mod range of its "from" value, so the last transition of a range
+	#crosses over into the next range
+	#Returns an (n_windows,8,8) integer array, n_windows being lastval//mod+1
+	index=octant_index(octants)
+	n_windows=(len(index)-1)//mod+1
+	windows=np.arange(len(index)-1,dtype=np.intp)//mod
+	counts=np.bincount(windows*64+index[:-1]*8+index[1:],minlength=64*n_windows)
+	return counts.reshape(n_windows,8,8)
+
+
+def octant_window_counts(octants,mod):
+	#Octant counts of every mod range with a single bincount, the same way as octant_transition_matrix
+	#Returns an (n_windows,8) integer array
+	index=octant_index(octants)
+	n_windows=(len(index)-1)//mod+1
+	windows=np.arange(len(index),dtype=np.intp)//mod
+	return np.bincount(windows*8+index,minlength=n_windows*8).reshape(n_windows,8)
+
+
+def octant_ranks(counts):
+	#Ranks of the octants in every row of an (n_windows,8) count matrix, rank 1 being the largest count
+	#Tied counts share the best of their ranks and the ranks after them are skipped (1,1,3,...), which is
+	#what the sort and rescan of the sample output gave
+	#Returns (ranks, rank1): the (n_windows,8) ranks and the index of the rank 1 octant of every row
+	#When several octants share rank 1 the last one in the order of OCTANT_CODES is taken
+	counts=np.asarray(counts)
+	ranks=1+(counts[:,None,:]>counts[:,:,None]).sum(axis=2)
+	rank1=7-np.argmax(ranks[:,::-1]==1,axis=1)
+	return ranks,rank1
+
+
+def octant_window_starts(n,size,stride):
+	#First rows of the sliding windows of "size" rows, one every "stride" rows, over an input of n rows
+	#Only whole windows are taken, an input shorter than one window gives a single shorter window
+	if(size<1 or stride<1):
+		raise ValueError("window size and stride must be positive")
+	return np.arange(0,max(n-size,0)+1,stride,dtype=np.intp)
+
+
+def octant_prefix_counts(values,positions,nbins):
+	#Counts of every bin (0 to nbins-1) in values[:p] for every p of the sorted, unique array "positions"
+	#The prefix counts are only kept at these positions: the rows are split into the segments between
+	#consecutive positions, a single bincount counts every segment and a cumsum adds the segments up
+	#Returns a (len(positions),nbins) integer array
+	edges=np.clip(positions,0,len(values))
+	segments=np.repeat(np.arange(len(edges)+1,dtype=np.intp),np.diff(np.concatenate(([0],edges,[len(values)]))))
+	counts=np.bincount(segments*nbins+values,minlength=(len(edges)+1)*nbins).reshape(-1,nbins)
+	return np.cumsum(counts[:len(edges)],axis=0)
+
+
+def octant_sliding_windows(octants,size,stride=1):
+	#Octant counts and transition counts of overlapping windows of "size" rows starting every "stride" rows
+	#Every window is the difference of the prefix counts at its two edges, so the cost does not grow
+	#with the overlap of the windows. As for the mod ranges a transition belongs to the window of its
+	#"from" row, so a window with stride=size is exactly a mod range of octant_transition_matrix
+	#Returns (starts, counts, transitions): the first row of every window, an (n_windows,8) and an
+	#(n_windows,8,8) integer array
+	index=octant_index(octants)
+	n=len(index)
+	starts=octant_window_starts(n,size,stride)
+	ends=np.minimum(starts+size,n)
+	edges=np.unique(np.concatenate((starts,ends)))
+	first=np.searchsorted(edges,starts)
+	last=np.searchsorted(edges,ends)
+	prefix=octant_prefix_counts(index,edges,8)
+	counts=prefix[last]-prefix[first]
+	prefix=octant_prefix_counts(index[:-1]*8+index[1:],edges,64)
+	transitions=(prefix[last]-prefix[first]).reshape(-1,8,8)
+	return starts,counts,transitions
+
+
+def write_sliding_windows(filename,starts,size,n,counts,transitions):
+	#Writes one line per sliding window to a csv file: its first and last row, the octant counts and the
+	#64 transition counts ("1>-1" is the count of transitions from 1 to -1)
+	labels=[str(code) for code in OCTANT_CODES]
+	header=["Start","End"]+labels+[a+">"+b for a in labels for b in labels]
+	table=np.column_stack((starts,np.minimum(starts+size,n)-1,counts,transitions.reshape(len(starts),64)))
+	np.savetxt(filename,table,fmt="%d",delimiter=",",header=",".join(header),comments="")
+
+
+def octant_mod_tables(octants,mods):
+	#Octant counts and transition tables of the mod ranges of several mod values in one pass
+	#The prefix counts of the octants and of the transitions are taken once, at the edges of the mod
+	#ranges of all the mod values together (see octant_prefix_counts), and every mod range of every
+	#mod value is the difference of two prefix rows
+	#Returns a dict mod -> (windowcounts, transitions), the same as octant_window_counts and
+	#octant_transition_matrix for that mod
+	index=octant_index(octants)
+	n=len(index)
+	edges=np.unique(np.concatenate([np.arange(0,n,mod,dtype=np.intp) for mod in mods]+[[n]]))
+	counts=octant_prefix_counts(index,edges,8)
+	pairs=octant_prefix_counts(index[:-1]*8+index[1:],edges,64)
+	tables={}
+	for mod in mods:
+		starts=np.arange(0,n,mod,dtype=np.intp)
+		first=np.searchsorted(edges,starts)
+		last=np.searchsorted(edges,np.minimum(starts+mod,n))
+		tables[mod]=(counts[last]-counts[first],(pairs[last]-pairs[first]).reshape(-1,8,8))
+	return tables
+
+
+#Summary of one closed mod window of OnlineOctantAnalyzer
+#window is the window number, first and last its first and last row, counts and ranks are in the order of
+#OCTANT_CODES, rank1 is the rank 1 octant code, transitions the 8x8 table and means the running U, V, W means
+OctantWindowSummary=namedtuple("OctantWindowSummary",["window","first","last","counts","ranks","rank1","transitions","means"])
+
 
 #Help
-def octant_analysis(mod=5000):
-	octant_name_id_mapping = {"1":"Internal outward interaction", "-1":"External outward interaction", "2":"External Ejection", "-2":"Internal Ejection", "3":"External inward interaction", "-3":"Internal inward interaction", "4":"Internal sweep", "-4":"External sweep"}
+#Octant statistics of a live stream of samples, in O(1) memory
+#Samples are given one at a time with add() or in batches with update(), e.g. as they come from a
+#socket or from the new lines of a CSV file. The analyzer keeps the running means and variances of
+#U, V, W (Welford), the octant counts, the 8x8 transition table and the current and longest runs
+#Every mod rows a window closes and its OctantWindowSummary is returned by update() and passed to
+#on_window if it is given. As in octant_transition_matrix the transition out of the last row of a
+#window belongs to that window, so a window closes when the first row of the next one arrives
+#The whole file is not known yet, so a sample is classified against the running means including it
+#Give "means" (the U, V, W averages) to classify against fixed means instead, the way tut07 does
+class OnlineOctantAnalyzer:
+
+	def __init__(self,mod=5000,means=None,on_window=None):
+		self.mod=mod
+		self.fixedmeans=None if means is None else np.asarray(means,dtype=np.float64)
+		self.on_window=on_window
+		self.n=0
+		self.mean=np.zeros(3)
+		self.m2=np.zeros(3)
+		self.counts=np.zeros(8,dtype=np.int64)
+		self.transitions=np.zeros((8,8),dtype=np.int64)
+		self.window=0
+		self.windowcounts=np.zeros(8,dtype=np.int64)
+		self.windowtransitions=np.zeros((8,8),dtype=np.int64)
+		#last octant index (-1 before the first sample) and the run it belongs to
+		self.last=-1
+		self.runlength=0
+		self.runstart=None
+		self.runend=None
+		#longest run length of every octant, how many runs have that length and the (from, to) times
+		#of the latest of them
+		self.large=np.zeros(8,dtype=np.int64)
+		self.longestcount=np.zeros(8,dtype=np.int64)
+		self.longestrange=[None]*8
+
+	@property
+	def variances(self):
+		#Sample variances of U, V and W
+		return self.m2/(self.n-1) if self.n>1 else np.zeros(3)
+
+	def add(self,u,v,w,t=None):
+		#Adds one sample, returns the list of windows closed by it (empty or one summary)
+		return self.update([u],[v],[w],None if t is None else [t])
+
+	def update(self,u,v,w,t=None):
+		#Adds a batch of samples, t are their times (the row numbers if not given)
+		#Returns the list of OctantWindowSummary of the windows closed by the batch
+		values=np.column_stack((np.asarray(u,dtype=np.float64),np.asarray(v,dtype=np.float64),np.asarray(w,dtype=np.float64)))
+		n=len(values)
+		if(n==0):
+			return []
+		first=self.n
+		previousmean=self.mean
+		t=np.arange(first,first+n) if t is None else np.asarray(t)
+
+		#Running means after every sample of the batch, and the batch merged into the Welford sums
+		#with the parallel (Chan) update so that the batch is handled with whole arrays
+		runningmeans=self.mean+np.cumsum(values-self.mean,axis=0)/np.arange(first+1,first+n+1)[:,None]
+		batchmean=values.mean(axis=0)
+		delta=batchmean-self.mean
+		self.m2=self.m2+((values-batchmean)**2).sum(axis=0)+delta*delta*first*n/(first+n)
+		self.mean=runningmeans[-1]
+		self.n=first+n
+
+		fluct=values-(runningmeans if self.fixedmeans is None else self.fixedmeans)
+		index=octant_index(octant_classify(fluct[:,0],fluct[:,1],fluct[:,2]))
+		#pairs[j] is the transition into sample j, the one into the first sample of the whole stream is dropped
+		pairs=np.concatenate(([max(self.last,0)],index[:-1]))*8+index
+		valid=0 if self.last>=0 else 1
+		self.counts+=np.bincount(index,minlength=8)
+		self.transitions+=np.bincount(pairs[valid:],minlength=64).reshape(8,8)
+		self.update_runs(index,t)
+		self.last=int(index[-1])
+
+		#The batch is split where the window changes, the window open before the batch gets the
+		#transition into the first sample of the next window before it is closed
+		summaries=[]
+		windows=np.arange(first,first+n)//self.mod
+		bounds=np.concatenate(([0],np.flatnonzero(np.diff(windows))+1,[n]))
+		for a,b in zip(bounds[:-1],bounds[1:]):
+			start=max(a,valid)
+			if(windows[a]!=self.window):
+				self.windowtransitions[pairs[a]//8,pairs[a]%8]+=1
+				summaries.append(self.close_window(runningmeans[a-1] if a>0 else previousmean))
+				self.window=int(windows[a])
+				start=a+1
+			self.windowcounts+=np.bincount(index[a:b],minlength=8)
+			self.windowtransitions+=np.bincount(pairs[start:b],minlength=64).reshape(8,8)
+		return summaries
+
+	def finish(self):
+		#Closes the open window at the end of the stream and returns its summary (None if there was no sample)
+		if(self.n==0):
+			return None
+		return self.close_window(self.mean)
+
+	def close_window(self,means):
+		ranks,rank1=octant_ranks(self.windowcounts[None,:])
+		first=self.window*self.mod
+		summary=OctantWindowSummary(self.window,first,min(first+self.mod,self.n)-1,self.windowcounts,ranks[0],
+			int(OCTANT_CODES[rank1[0]]),self.windowtransitions,means.copy())
+		self.windowcounts=np.zeros(8,dtype=np.int64)
+		self.windowtransitions=np.zeros((8,8),dtype=np.int64)
+		if(self.on_window is not None):
+			self.on_window(summary)
+		return summary
+
+	def update_runs(self,index,t):
+		#Run length encoding of the batch, the first run continues the open run if the octant is the same
+		#All runs but the last one of the batch are closed
+		runvalues,runstarts,runlengths=octant_runs(index)
+		runends=t[np.append(runstarts[1:],len(index))-1]
+		runstarttimes=t[runstarts].astype(object)
+		if(self.runlength>0):
+			if(runvalues[0]==self.last):
+				runlengths[0]+=self.runlength
+				runstarttimes[0]=self.runstart
+			else:
+				self.record_runs(self.large,self.longestcount,self.longestrange,[self.last],[self.runlength],[self.runstart],[self.runend])
+		self.record_runs(self.large,self.longestcount,self.longestrange,runvalues[:-1],runlengths[:-1],runstarttimes[:-1],runends[:-1])
+		self.runlength=int(runlengths[-1])
+		self.runstart=runstarttimes[-1]
+		self.runend=runends[-1]
+
+	@staticmethod
+	def record_runs(large,count,ranges,runindex,runlengths,runstarts,runends):
+		#Merges closed runs (octant indices, lengths, start and end times) into the longest run tables
+		runindex=np.asarray(runindex)
+		runlengths=np.asarray(runlengths)
+		for i in np.unique(runindex):
+			selected=np.flatnonzero(runindex==i)
+			length=runlengths[selected].max()
+			if(length>large[i]):
+				large[i]=length
+				count[i]=0
+			if(length==large[i]):
+				longest=selected[runlengths[selected]==length]
+				count[i]+=len(longest)
+				ranges[i]=(runstarts[longest[-1]],runends[longest[-1]])
+
+	def longest_runs(self):
+		#Longest run of every octant so far, counting the open run as if the stream ended here
+		#Returns (large, count, ranges) in the order of OCTANT_CODES, ranges[i] being the (from, to)
+		#times of the latest longest run of the octant, or None if it never occurs
+		large=self.large.copy()
+		count=self.longestcount.copy()
+		ranges=list(self.longestrange)
+		if(self.runlength>0):
+			self.record_runs(large,count,ranges,[self.last],[self.runlength],[self.runstart],[self.runend])
+		return large,count,ranges
+
+
+#Columns of the report written to the right of the input columns, in the order of the excel sheet
+#Most of them have blank names made of spaces, as in the sample output
+REPORT_COLUMNS=["", " ", "Overall Octant Count"]+[" "*i for i in range(2,22)]+["Overall Transition Count"]+[" "*i for i in range(23,32)]+["Longest Subsequence Length", " "*33, " "*34, " "*35, "Longest Subsequence Length with Range", " "*37, " "*38]
+REPORT_POSITION={name:position for position,name in enumerate(REPORT_COLUMNS)}
+
+#Report columns which keep the default width in the excel sheet
+DEFAULT_WIDTH_COLUMNS=["  ","   ","    ","     ","      ","       ","        ","         "," "*21," "*23," "*24," "*25," "*26," "*27," "*28," "*29," "*30," "*34," "*38]
+
+
+def report_cell(report,row,column,value):
+	#Writes a value to the report grid (a list of rows, one entry per column of REPORT_COLUMNS)
+	#Empty rows are added to the grid when needed
+	while(len(report)<=row):
+		report.append([""]*len(REPORT_COLUMNS))
+	report[row][REPORT_POSITION[column]]=value
+
+
+def write_octant_workbook(filename,data,report,highlight,boxes):
+	#Writes the input columns and the report grid to the excel file, see write_octant_sheet
 	import pandas as pd
+	writer = pd.ExcelWriter(filename, engine="xlsxwriter")
+	write_octant_sheet(writer, 'Sheet1', data, report, highlight, boxes)
+	writer.close()
+
+
+def write_octant_sheet(writer,sheetname,data,report,highlight,boxes):
+	#Writes the input columns and the report grid to one sheet of an xlsxwriter ExcelWriter in a single pass
+	#highlight is a set of (row, column) cells of the report which are filled yellow and boxes a list of
+	#(firstrow, lastrow, firstcolumn, lastcolumn) ranges of the report which get a thin border
+	#Rows are the rows of the report grid, which start right below the header row of the sheet
+	#Column widths are calculated from the report only, the input columns get the width of their name
+	import pandas as pd
+	data.to_excel(writer, sheet_name=sheetname, index=False, na_rep='NaN')
+	startcol = len(data.columns)
+	pd.DataFrame(report, columns=REPORT_COLUMNS).to_excel(writer, sheet_name=sheetname, index=False, startcol=startcol)
+	sheet = writer.sheets[sheetname]
+
+	#the averages and U', V', W' are numbers in the sheet, shown with 3 decimals
+	threedecimals = writer.book.add_format({'num_format': '0.000'})
+	for c, column in enumerate(data.columns):
+		if (column in ["U Avg","V Avg","W Avg","U'=U-U Avg","V'=V-V Avg","W'=W-W Avg"]):
+			sheet.set_column(c, c, max(len(column), 8), threedecimals)
+		else:
+			sheet.set_column(c, c, max(len(column), 8))
+	for c, column in enumerate(REPORT_COLUMNS):
+		if (not (column in DEFAULT_WIDTH_COLUMNS)):
+			width = max([len(str(row[c])) for row in report]+[len(column)])
+			sheet.set_column(startcol+c, startcol+c, width)
+
+	#FFFF00 hex code for yellow used in the sample output
+	styles = {}
+	for cell in highlight:
+		styles[cell] = (True, False)
+	for firstrow, lastrow, firstcolumn, lastcolumn in boxes:
+		for r in range(firstrow, lastrow+1):
+			for c in range(REPORT_POSITION[firstcolumn], REPORT_POSITION[lastcolumn]+1):
+				styles[(r, REPORT_COLUMNS[c])] = ((r, REPORT_COLUMNS[c]) in highlight, True)
+	formats = {}
+	for fill, border in set(styles.values()):
+		properties = {}
+		if fill:
+			properties.update({'pattern': 1, 'bg_color': '#FFFF00'})
+		if border:
+			properties.update({'border': 1, 'border_color': '#000000'})
+		formats[(fill, border)] = writer.book.add_format(properties)
+	for (r, column), style in styles.items():
+		value = report[r][REPORT_POSITION[column]] if r < len(report) else ""
+		sheet.write(r+1, startcol+REPORT_POSITION[column], value, formats[style])
+
+
+#Folder of the cache of parsed input files, see read_octant_input. It can be deleted at any time
+#tut02 and tut07 may share the folder, the name of the tool is part of the name of every cache file
+CACHE_DIR=".octant_cache"
+#Version of the cached data, to be increased whenever the parsing or the octant classification changes
+CACHE_VERSION=1
+
+
+def file_hash(filename):
+	#SHA-256 of the contents of the file, read in blocks of 1 MB
+	digest=hashlib.sha256()
+	with open(filename,"rb") as file:
+		for block in iter(lambda: file.read(1<<20),b""):
+			digest.update(block)
+	return digest.hexdigest()
+
+
+def read_octant_input(filename,cache=True):
+	#Reads the input file and classifies the octants of all its rows. Returns (data, octants)
+	#The parsed columns and the octant array are cached in CACHE_DIR as an .npz file named after the
+	#SHA-256 of the file contents. Running again on the same file, with the same or another mod value,
+	#skips both the excel parsing and the classification. A changed file has a different hash and is
+	#parsed again. The octants do not depend on the mod value, so it is not part of the key
+	#Files made by --ingest (.octc) are opened directly with their stored octants, see ingest_octant_input
+	import pandas as pd
+	if(filename.endswith(".octc")):
+		columns=read_columnar(filename)
+		missing=[name for name in ["T","U","V","W","Octant"] if name not in columns]
+		if(missing):
+			raise ValueError(filename+" has no "+", ".join(missing)+" column")
+		octants=columns.pop("Octant")
+		return pd.DataFrame(columns),octants
+	if(cache):
+		cachefile=os.path.join(CACHE_DIR,file_hash(filename)+".tut07.v"+str(CACHE_VERSION)+".npz")
+		if(os.path.exists(cachefile)):
+			with np.load(cachefile,allow_pickle=False) as cached:
+				data=pd.DataFrame({name:cached["column"+str(i)] for i,name in enumerate(cached["columns"])})
+				return data,cached["octants"]
+	data=pd.read_excel(filename)
+	octants=octant_classify(*[octant_fluctuations(data[name].to_numpy(np.float64))[1] for name in ["U","V","W"]])
+	#only numeric columns can be stored without pickling, other inputs are simply not cached
+	if(cache and all(data[name].dtype.kind in "biuf" for name in data.columns)):
+		os.makedirs(CACHE_DIR,exist_ok=True)
+		arrays={"column"+str(i):data[name].to_numpy() for i,name in enumerate(data.columns)}
+		#written to a temporary file first so that parallel workers never read a half written cache
+		temporary=cachefile+"."+str(os.getpid())+".tmp"
+		with open(temporary,"wb") as file:
+			np.savez(file,columns=np.array(data.columns,dtype=str),octants=octants,**arrays)
+		os.replace(temporary,cachefile)
+	return data,octants
+
+
+#Memory-mapped columnar file made by --ingest, see write_columnar
+#Layout: a 24 byte header (magic, version, number of rows, length of the column table), the column
+#table as JSON (name, dtype and byte offset of every column) and then the columns one after the other,
+#each one starting at a multiple of 64 bytes
+#The magic differs between tut02 and tut07, their files hold different columns (here T, U, V and W)
+#and octants classified with different rules, so a file of one tool is refused by the other
+COLUMNAR_MAGIC=b"OC07"
+COLUMNAR_VERSION=1
+COLUMNAR_HEADER=struct.Struct("<4sIQQ")
+
+
+def write_columnar(filename,columns):
+	#Writes a dict of equally long 1-D arrays to filename in the columnar format
+	nrows=len(next(iter(columns.values())))
+	table=[]
+	offset=0
+	for name,array in columns.items():
+		table.append({"name":name,"dtype":array.dtype.str,"offset":offset})
+		offset+=-(-array.nbytes//64)*64
+	tablebytes=json.dumps(table).encode()
+	start=-(-(COLUMNAR_HEADER.size+len(tablebytes))//64)*64
+	with open(filename,"wb") as file:
+		file.write(COLUMNAR_HEADER.pack(COLUMNAR_MAGIC,COLUMNAR_VERSION,nrows,len(tablebytes)))
+		file.write(tablebytes)
+		for entry,array in zip(table,columns.values()):
+			file.seek(start+entry["offset"])
+			file.write(np.ascontiguousarray(array).tobytes())
+		file.truncate(start+offset)
+
+
+def read_columnar(filename):
+	#Opens a file written by write_columnar. Returns a dict of read-only np.memmap columns, nothing is
+	#read from the disk until the data is used and the pages are shared by all processes using the file
+	with open(filename,"rb") as file:
+		magic,version,nrows,tablelength=COLUMNAR_HEADER.unpack(file.read(COLUMNAR_HEADER.size))
+		if(magic!=COLUMNAR_MAGIC or version!=COLUMNAR_VERSION):
+			raise ValueError(filename+" is not a columnar octant file of tut07, ingest the workbook again with tut07")
+		table=json.loads(file.read(tablelength))
+	start=-(-(COLUMNAR_HEADER.size+tablelength)//64)*64
+	columns={}
+	for entry in table:
+		if(nrows==0):
+			columns[entry["name"]]=np.zeros(0,dtype=entry["dtype"])
+		else:
+			columns[entry["name"]]=np.memmap(filename,dtype=entry["dtype"],mode="r",offset=start+entry["offset"],shape=(nrows,))
+	return columns
+
+
+def ingest_octant_input(filename,outputfile=None,dtype=np.float64):
+	#Converts an input workbook once to the columnar format: T, U, V and W as float64 (or float32)
+	#columns and the octants as an int8 column. The analysis then reads the .octc file with np.memmap
+	#instead of parsing the workbook again
+	#Returns the name of the written file, by default the workbook name with the .octc extension
+	data,octants=read_octant_input(filename,cache=False)
+	if(outputfile is None):
+		outputfile=os.path.splitext(filename)[0]+".octc"
+	columns={name:data[name].to_numpy(dtype) for name in ["T","U","V","W"]}
+	columns["Octant"]=np.asarray(octants,dtype=np.int8)
+	write_columnar(outputfile,columns)
+	return outputfile
+
+
+def octant_input_files(folder):
+	#Files of the input folder to be analysed. A workbook which has been ingested is analysed from its
+	#.octc file instead, unless the workbook has been changed after it was ingested
+	def newer(first,second):
+		return os.path.getmtime(os.path.join(folder,first))>os.path.getmtime(os.path.join(folder,second))
+	inputfiles=sorted(os.listdir(folder))
+	workbooks={os.path.splitext(reading)[0]:reading for reading in inputfiles if not reading.endswith(".octc")}
+	selected=[]
+	for reading in inputfiles:
+		name=os.path.splitext(reading)[0]
+		if(reading.endswith(".octc")):
+			if(not (name in workbooks and newer(workbooks[name],reading))):
+				selected.append(reading)
+		elif(not ((name+".octc") in inputfiles and not newer(reading,name+".octc"))):
+			selected.append(reading)
+	return selected
+
+
+#Help
+#Stage profiling of the analysis of one file. A profile is a plain dict, so that it can be sent back
+#from the worker processes, with the stages in the order in which they were first entered
+#"memory" turns on the tracemalloc high-water mark of every stage and "cprofile" names the one stage
+#which is run under cProfile, its stats are dumped to "cprofile_file". A stage which runs more than once
+#(layout with several mod values) adds up all its runs in the file
+def octant_profile(memory=False,cprofile=None,cprofile_file=None):
+	return {"stages":{},"stack":[],"memory":memory,"cprofile":cprofile,"cprofile_file":cprofile_file,"cprofile_runs":0}
+
+
+#Times the code of the with block as stage "name" of the profile, nothing is done when profile is None
+#Stages can be nested, the time and memory of a stage only count what is not in its inner stages,
+#so the seconds of all the stages add up to the time of the whole file
+#The memory peak is the largest amount of traced memory above the start of the stage, in bytes
+@contextlib.contextmanager
+def octant_stage(profile,name):
+	if(profile is None):
+		yield
+		return
+	stats=profile["stages"].setdefault(name,{"seconds":0.0,"peak":0})
+	stack=profile["stack"]
+	tracing=profile["memory"] and tracemalloc.is_tracing()
+	frame={"inner":0.0,"start":0,"peak":0}
+	if(tracing):
+		current,peak=tracemalloc.get_traced_memory()
+		#the peak of the outer stage so far is kept in its frame before the peak is reset for this stage
+		if(stack):
+			stack[-1]["peak"]=max(stack[-1]["peak"],peak)
+		#reset_peak is only in Python 3.9 and later. Before it, every stage reports the peak of the whole file so far
+		if(hasattr(tracemalloc,"reset_peak")):
+			tracemalloc.reset_peak()
+			frame["start"]=current
+	stack.append(frame)
+	profiler=None
+	if(name==profile["cprofile"]):
+		profiler=cProfile.Profile()
+		profiler.enable()
+	start=time.perf_counter()
 	try:
-		inputfiles=os.listdir("input")
-		for reading in inputfiles:
-			#outdata=[pd.read_csv("output\\"+i+"vel_octant_analysis_mod"+str(mod))]
-			data=pd.read_excel("input\\"+reading)
-			lastval=data.index[-1]
-			mean1=data["U"].mean()
-			mean2=data["V"].mean()
-			mean3=data["W"].mean()
-			data["U Avg"]=""
-			data["V Avg"]=""
-			data["W Avg"]=""
-			data["U'=U-U Avg"]=""
-			data["V'=V-V Avg"]=""
-			data["W'=W-W Avg"]=""
-			data["Octant"]=""
-			rm1=format(mean1,".3f")
-			rm2=format(mean2,".3f")
-			rm3=format(mean3,".3f")
-			data.at[0,"U Avg"]=rm1
-			data.at[0,"V Avg"]=rm2
-			data.at[0,"W Avg"]=rm3
-			for i in range(0,lastval+1,1):
-				a=round(data["U"][i],3)-float(data["U Avg"][0])
-				data.at[i,"U'=U-U Avg"]=format(a,".3f")
-			for i in range(0,lastval+1,1):
-				a=round(data["V"][i],3)-float(data["V Avg"][0])
-				data.at[i,"V'=V-V Avg"]=format(a,".3f")
-			for i in range(0,lastval+1,1):
-				a=round(data["W"][i],3)-float(data["W Avg"][0])
-				data.at[i,"W'=W-W Avg"]=format(a,".3f")	
-			for i in range(0,lastval+1,1):
-				#print(type(data["U'=U-U Avg"][i]))
-				u=float(data["U'=U-U Avg"][i])
-				v=float(data["V'=V-V Avg"][i])
-				w=float(data["W'=W-W Avg"][i])
-				
-				if((u==0) or(v==0)or(w==0)):
-					data.at[i,'Octant']=1
-				else:	
-					if u>0:
-						if v>0:
-							if w>0:
-								
-								data.at[i,'Octant']=1
-							else:
-								
-								data.at[i,'Octant']=-1
-						else:
-							if w>0:
-								
-								data.at[i,'Octant']=4
-							else:
-								
-								data.at[i,'Octant']=-4
-					else:
-						if v>0:
-							if w>0:
-								data.at[i,'Octant']=2
-							else:
-								data.at[i,'Octant']=-2
-						else:
-							if w>0:
-								data.at[i,'Octant']=3
-							else: 
-								data.at[i,'Octant']=-3				
-			data[""]=""
-			data[" "]=""
-			data["Overall Octant Count"]=""
-			data.at[1,"Overall Octant Count"]="Octant ID"
-			data.at[2,"Overall Octant Count"]="Overall Count"
-			data.at[2," "]="Mod "+str(mod)
-			data["  "]=""
-			data["   "]=""
-			data["    "]=""
-			data["     "]=""
-			data["      "]=""
-			data["       "]=""
-			data["        "]=""
-			data["         "]=""
-			data.at[1,"  "]="1"
-			data.at[1,"   "]="-1"
-			data.at[1,"    "]="2"
-			data.at[1,"     "]="-2"
-			data.at[1,"      "]="3"
-			data.at[1,"       "]="-3"
-			data.at[1,"        "]="4"
-			data.at[1,"         "]="-4"
-			for i in range(10,22,1):
-				data[" "*i]=""	
-			data.at[1," "*18]="Rank1 Octant ID"
-			data.at[1," "*19]="Rank1 Octant Name"
-			values=[1,-1,2,-2,3,-3,4,-4]
-			for i in range(0,8,1):
-				x=" "*(i+10)
-				data.at[1,x]="Rank Octant "+str(values[i])
-			
-			#s=1
-			#for i in values:
-			#	data.at[0,str(i)]="Rank"+" "+str(s)
-			#	s+=1
-			#data.at[0,"1"]="Rank 1"
-			#lastval=data.index[-1]
-			
-			count1=0
-			countm1=0
-			count2=0
-			countm2=0
-			count3=0
-			countm3=0
-			count4=0
-			countm4=0
-			multiply=lastval//mod
-			counterforeachoctant=2
-			a=0
-			b=0
-			c=0
-			d=0
-			e=0
-			f=0
-			g=0
-			h=0
-			for j in range(1,multiply+2,1):
-				if(j==1):
-					data.at[j+2,"Overall Octant Count"]="0000"+"-"+str(mod-1)
-				else:
-					if(j<=multiply):
-						num=str(mod*(j-1))+"-"+str(mod*j - 1)
-						data.at[j+2,"Overall Octant Count"]=num
-					else:
-						num=str(mod*(j-1))+"-"+str(lastval)
-						data.at[j+2,"Overall Octant Count"]=num
-			rank1count=[0,0,0,0,0,0,0,0]
-			for i in range(0,lastval+1,1):
-				u=data["U'=U-U Avg"][i]
-				v=data["V'=V-V Avg"][i]
-				w=data["W'=W-W Avg"][i]                   
-				if((data["Octant"][i])==1):
-					count1+=1
-				elif((data["Octant"][i])==-1):
-					countm1+=1
-				elif((data["Octant"][i])==2):
-					count2+=1
-				elif((data["Octant"][i])==-2):
-					countm2+=1   
-				elif((data["Octant"][i])==3):
-					count3+=1
-				elif((data["Octant"][i])==-3):
-					countm3+=1
-				elif((data["Octant"][i])==4):
-					count4+=1
-				elif((data["Octant"][i])==-4):
-					countm4+=1
-				if(((i!=0)and((i+1)%mod==0))or(i==lastval)):
-					data.at[counterforeachoctant+1,"  "]=count1-a
-					data.at[counterforeachoctant+1,"   "]=countm1-b
-					data.at[counterforeachoctant+1,"    "]=count2-c
-					data.at[counterforeachoctant+1,"     "]=countm2-d
-					data.at[counterforeachoctant+1,"      "]=count3-e
-					data.at[counterforeachoctant+1,"       "]=countm3-f
-					data.at[counterforeachoctant+1,"        "]=count4-g
-					data.at[counterforeachoctant+1,"         "]=countm4-h
-					counts=[count1-a,countm1-b,count2-c,countm2-d,count3-e,countm3-f,count4-g,countm4-h]
-					ncounts=sorted(counts)
-					for i in range(0,8,1):
-						for j in range(0,8,1):
-							if (ncounts[i]==counts[j]):
-								data.at[counterforeachoctant+1," "*(j+10)]=8-i
-								data.at[counterforeachoctant+1," "*18]=values[j]
-								data.at[counterforeachoctant+1," "*19]=octant_name_id_mapping[str(values[j])]
-								if (i==7):
-									rank1count[j]=rank1count[j]+1
-					a,b,c,d,e,f,g,h=count1,countm1,count2,countm2,count3,countm3,count4,countm4
-					counterforeachoctant+=1
-				else:
-					continue
-				
-			data.at[2,"  "]=count1
-			data.at[2,"   "]=countm1
-			data.at[2,"    "]=count2
-			data.at[2,"     "]=countm2
-			data.at[2,"      "]=count3
-			data.at[2,"       "]=countm3
-			data.at[2,"        "]=count4
-			data.at[2,"         "]=countm4
-			
-			ovcounts=[count1,countm1,count2,countm2,count3,countm3,count4,countm4]    
-			novcounts=sorted(ovcounts)
-			for i in range(0,8,1):
-				for j in range(0,8,1):
-					if (novcounts[i]==ovcounts[j]):
-						data.at[2," "*(j+10)]=8-i
-						data.at[2," "*18]=values[j]
-						data.at[2," "*19]=octant_name_id_mapping[str(values[j])]
-			newpos=5+(lastval//mod)
-			data.at[newpos," "*16]="Octant ID"
-			data.at[newpos," "*17]="Octant Name"
-			data.at[newpos," "*18]="Count of Rank 1 Mod Values"
-			for i in range(0,8,1):
-				data.at[newpos+1+i," "*16]=values[i]
-				data.at[newpos+1+i," "*17]=octant_name_id_mapping[str(values[i])]
-				data.at[newpos+1+i," "*18]=rank1count[i]
-
-			
-			#################################
-			#This is the overall transition count
-			data["Overall Transition Count"]=""
-			for i in range(23,32,1):
-				data[" "*i]=""
-			data.at[2," "*21]="From"	
-			data.at[0," "*23]="To"
-			data.at[1,"Overall Transition Count"]="Octant"	
-			listofvalues=[+1,-1,+2,-2,+3,-3,+4,-4]
-			for i in range(0,8,1):
-				data.at[i+2,"Overall Transition Count"]=listofvalues[i]
-				data.at[1," "*(i+23)]=listofvalues[i]             
-			##################################
-
-			
-			#####################################
-			#To count the total octant transitions
-			#We iterate through all the values in the dataframe in the "octant" column
-			#if there is a change in the value from ith to (i+1)th octant value then the position of writing 
-			#in the excel sheet is stored in the two variables "toposition" and "fromposition" to uniquely
-			#write to a particular cell in the excel sheet
-			for i in range(0,lastval,1):
-				values=[1,-1,2,-2,3,-3,4,-4]
-				for j in range(0,8,1):
-					if(values[j]==data["Octant"][i]):
-						fromposition=2+j
-					if(values[j]==data["Octant"][i+1]):
-						toposition=" "*(23+j)
-				if(not(data[toposition][fromposition])):
-					data.at[fromposition,toposition]=1 
-				else:    
-					data.at[fromposition,toposition]=data[toposition][fromposition]+1
-			######################################
-				
-			
-			multiply = lastval//mod
-			#We initialize all the octant transitions in each mod range by filling the matrix with zeroes
-			#the variable k helps to get to the beginning of a new table of writing cells
-			#the exact position of the writing cells is determined by two variables "toposition" and "fromposition"
-			for k in range(0,multiply+1,1):
-				for i in range(0,8,1):
-					for j in range(0,8,1):
-						fromposition=16+(13*k)+i
-						toposition=" "*(23+j)
-						data.at[fromposition,toposition]=0 
-
-
-			
-			##########################################3
-			#Writing down the table headers and other values before writing the transition counts
-			for k in range(0,multiply+1,1):
-				data.at[13+(13*k),"Overall Transition Count"]="Mod Transition Count"
-				data.at[14+(13*k)," "*23]="To"
-				data.at[15+(13*k),"Overall Transition Count"]="Octant"
-				for i in range(0,8,1):
-					data.at[16+(13*k)+i,"Overall Transition Count"]=values[i]
-					data.at[15+(13*k)," "*(i+23)]=values[i]   
-				data.at[16+(13*k)," "*21]="From"
-				if(k==0):
-					data.at[14+(13*k),"Overall Transition Count"]="0000"+"-"+str(mod-1)
-				else:
-					if(k<multiply):
-						num=str(mod*(k))+"-"+str(mod*(k+1) - 1)
-						data.at[14+(13*k),"Overall Transition Count"]=num
-					else:
-						num=str(mod*(k))+"-"+str(lastval)
-						data.at[14+(13*k),"Overall Transition Count"]=num   
-				
-				for i in range(0,8,1):
-					data.at[i+2,"Overall Transition Count"]=listofvalues[i]
-					data.at[1," "*(i+23)]=listofvalues[i]   
-				#######################################
-
-				
-				for i in range(mod*(k),mod*(k+1),1):
-					if(i==lastval):
-						break
-					for j in range(0,8,1):
-						if(values[j]==data["Octant"][i]):
-							fromposition=16+(13*k)+j
-						if(values[j]==data["Octant"][i+1]):
-							toposition=" "*(23+j)
-					if(not(data[toposition][fromposition])):
-						data.at[fromposition,toposition]=1 #inserts 1 if value is empty
-					else:    
-						data.at[fromposition,toposition]=data[toposition][fromposition]+1   #adds 1 if value is not empty          
-			data["Longest Subsequence Length"]=""
-			data.at[1,"Longest Subsequence Length"]="Octant"
-			for i in range(0,8,1):
-				data.at[2+i,"Longest Subsequence Length"]=values[i]
-			data[" "*33]=""
-			data[" "*34]=""
-			data[" "*35]=""
-			
-			
-			##############################
-			count=[0,0,0,0,0,0,0,0] #creating an empty array to store the counted values of consecutive occurrences
-			large=[0,0,0,0,0,0,0,0] #creating another empty array to store the largest consecutively counted occurrences
-			for i in range(0,lastval,1):
-				if(data['Octant'][i]==data['Octant'][i+1]):
-					for j in range(0,8,1):
-						if (data['Octant'][i]==values[j]):
-							count[j]+=1
-							pos=j
-				else:
-					if (count[pos]>large[pos]):
-						large[pos]=count[pos]   
-						count[pos]=0
-						#print(i)
-					else:
-						large[pos]=large[pos]   
-						count[pos]=0          
-						
+		yield
+	finally:
+		elapsed=time.perf_counter()-start
+		if(profiler is not None):
+			profiler.disable()
+			cprofile_file=profile["cprofile_file"] or name+".prof"
+			cprofile_stats=pstats.Stats(profiler)
+			if(profile["cprofile_runs"]):
+				cprofile_stats.add(cprofile_file)
+			cprofile_stats.dump_stats(cprofile_file)
+			profile["cprofile_runs"]+=1
+		stack.pop()
+		stats["seconds"]+=elapsed-frame["inner"]
+		if(stack):
+			stack[-1]["inner"]+=elapsed
+		if(tracing):
+			peak=max(frame["peak"],tracemalloc.get_traced_memory()[1])
+			stats["peak"]=max(stats["peak"],peak-frame["start"])
+			if(stack):
+				stack[-1]["peak"]=max(stack[-1]["peak"],peak)
+
+
+#Prints the seconds (and the memory peak if it was traced) of every stage of a profile
+def print_octant_profile(profile):
+	for name,stats in profile["stages"].items():
+		if(profile["memory"]):
+			print("    {:<14}{:>9.4f} s {:>10.1f} MB".format(name,stats["seconds"],stats["peak"]/2**20))
+		else:
+			print("    {:<14}{:>9.4f} s".format(name,stats["seconds"]))
+
+
+#Adds the averages, U', V', W' and the octants to the input columns
+def octant_columns(data,octants):
+	#U', V' and W' are kept as float64 columns, the rounding to 3 decimals is done once on the whole
+	#arrays and the formatting to 3 decimals is left to the writer
+	mean1,fluct1=octant_fluctuations(data["U"].to_numpy(np.float64))
+	mean2,fluct2=octant_fluctuations(data["V"].to_numpy(np.float64))
+	mean3,fluct3=octant_fluctuations(data["W"].to_numpy(np.float64))
+	data["U Avg"]=""
+	data["V Avg"]=""
+	data["W Avg"]=""
+	data.at[0,"U Avg"]=mean1
+	data.at[0,"V Avg"]=mean2
+	data.at[0,"W Avg"]=mean3
+	data["U'=U-U Avg"]=fluct1
+	data["V'=V-V Avg"]=fluct2
+	data["W'=W-W Avg"]=fluct3
+	data["Octant"]=octants
+	return data
+
+
+#Lays out the report of the octant analysis of "data" (with the columns of octant_columns)
+#Returns (report, highlight, boxes) for write_octant_workbook
+#The counting, transitions and longest runs are timed as stages of "profile" (see octant_stage)
+#"tables" (the (windowcounts, transitions) of octant_mod_tables) and "runs" (octant_longest_runs) are
+#used instead of counting again when they are given, e.g. when the report is made for several mod values
+def octant_report(data,mod=5000,profile=None,tables=None,runs=None):
+	lastval=data.index[-1]
+	#The report is laid out in its own grid of cells (see REPORT_COLUMNS), the input DataFrame only
+	#gets the columns of octant_columns. "highlight" collects the cells to be filled yellow
+	report=[]
+	highlight=set()
+	report_cell(report,1,"Overall Octant Count","Octant ID")
+	report_cell(report,2,"Overall Octant Count","Overall Count")
+	report_cell(report,2," ","Mod "+str(mod))
+	report_cell(report,1,"  ","1")
+	report_cell(report,1,"   ","-1")
+	report_cell(report,1,"    ","2")
+	report_cell(report,1,"     ","-2")
+	report_cell(report,1,"      ","3")
+	report_cell(report,1,"       ","-3")
+	report_cell(report,1,"        ","4")
+	report_cell(report,1,"         ","-4")
+	report_cell(report,1," "*18,"Rank1 Octant ID")
+	report_cell(report,1," "*19,"Rank1 Octant Name")
+	values=[1,-1,2,-2,3,-3,4,-4]
+	for i in range(0,8,1):
+		x=" "*(i+10)
+		report_cell(report,1,x,"Rank Octant "+str(values[i]))
+	
+	multiply=lastval//mod
+	for j in range(1,multiply+2,1):
+		if(j==1):
+			report_cell(report,j+2,"Overall Octant Count","0000"+"-"+str(mod-1))
+		else:
+			if(j<=multiply):
+				num=str(mod*(j-1))+"-"+str(mod*j - 1)
+				report_cell(report,j+2,"Overall Octant Count",num)
+			else:
+				num=str(mod*(j-1))+"-"+str(lastval)
+				report_cell(report,j+2,"Overall Octant Count",num)
+
+	#Octant counts of every mod range and their ranks, all calculated as arrays
+	#Row 2 of the report is the overall count and the rows below it are the mod ranges
+	octants=data["Octant"].to_numpy()
+	with octant_stage(profile,"counting"):
+		windowcounts=octant_window_counts(octants,mod) if tables is None else tables[0]
+		allcounts=np.vstack((windowcounts.sum(axis=0),windowcounts))
+		ranks,rank1=octant_ranks(allcounts)
+		rank1count=(ranks[1:]==1).sum(axis=0)
+	for r in range(0,multiply+2,1):
+		for j in range(0,8,1):
+			report_cell(report,r+2," "*(j+2),int(allcounts[r,j]))
+			report_cell(report,r+2," "*(j+10),int(ranks[r,j]))
+			if(ranks[r,j]==1):
+				highlight.add((r+2," "*(j+10)))
+		report_cell(report,r+2," "*18,values[rank1[r]])
+		report_cell(report,r+2," "*19,octant_name_id_mapping[str(values[rank1[r]])])
+	newpos=5+(lastval//mod)
+	report_cell(report,newpos," "*16,"Octant ID")
+	report_cell(report,newpos," "*17,"Octant Name")
+	report_cell(report,newpos," "*18,"Count of Rank 1 Mod Values")
+	for i in range(0,8,1):
+		report_cell(report,newpos+1+i," "*16,values[i])
+		report_cell(report,newpos+1+i," "*17,octant_name_id_mapping[str(values[i])])
+		report_cell(report,newpos+1+i," "*18,int(rank1count[i]))
+
+	
+	#################################
+	#This is the overall transition count
+	report_cell(report,2," "*21,"From")    
+	report_cell(report,0," "*23,"To")
+	report_cell(report,1,"Overall Transition Count","Octant")    
+	for i in range(0,8,1):
+		report_cell(report,i+2,"Overall Transition Count",values[i])
+		report_cell(report,1," "*(i+23),values[i])             
+	##################################
+
+	
+	#####################################
+	#To count the octant transitions
+	#octant_transition_matrix gives the 8x8 transition table of every mod range, their sum is the
+	#overall transition table. The tables only have to be written down in the report
+	#"fromposition" is the row and "toposition" the column of the octant in the report
+	#The largest count of every row of a table is filled yellow
+	with octant_stage(profile,"transitions"):
+		transitions=octant_transition_matrix(octants,mod) if tables is None else tables[1]
+		overalltransitions=transitions.sum(axis=0)
+	for i in range(0,8,1):
+		fromposition=2+i
+		for j in range(0,8,1):
+			toposition=" "*(23+j)
+			report_cell(report,fromposition,toposition,int(overalltransitions[i,j]))
+			if(overalltransitions[i,j]==overalltransitions[i].max()):
+				highlight.add((fromposition,toposition))
+	######################################
+		
+	
+	##########################################
+	#Writing down the table headers and the transition counts of every mod range, one table every 13 rows
+	for k in range(0,multiply+1,1):
+		report_cell(report,13+(13*k),"Overall Transition Count","Mod Transition Count")
+		report_cell(report,14+(13*k)," "*23,"To")
+		report_cell(report,15+(13*k),"Overall Transition Count","Octant")
+		for i in range(0,8,1):
+			report_cell(report,16+(13*k)+i,"Overall Transition Count",values[i])
+			report_cell(report,15+(13*k)," "*(i+23),values[i])   
+		report_cell(report,16+(13*k)," "*21,"From")
+		if(k==0):
+			report_cell(report,14+(13*k),"Overall Transition Count","0000"+"-"+str(mod-1))
+		else:
+			if(k<multiply):
+				num=str(mod*(k))+"-"+str(mod*(k+1) - 1)
+				report_cell(report,14+(13*k),"Overall Transition Count",num)
+			else:
+				num=str(mod*(k))+"-"+str(lastval)
+				report_cell(report,14+(13*k),"Overall Transition Count",num)   
+		#######################################
+
+		for i in range(0,8,1):
+			fromposition=16+(13*k)+i
 			for j in range(0,8,1):
-				for i in range(0,lastval,1):
-					if (data['Octant'][i]==values[j]):
-						large[j]+=1
-						break
-			
-			#code to count how many largest occurrences present for each octant value
-			count2=[0,0,0,0,0,0,0,0]              
-			for j in range(0,8,1):                   
-				for i in range(0,lastval-large[j]+1,1):
-					supercount=0
-					for k in range(0,large[j],1):
-						if(data['Octant'][i+k]==values[j]):
-							supercount+=1
-					if(supercount==large[j]):
-						count2[j]+=1
-			#code to insert the final values to the excel sheet
-			for i in range(0,8,1):
-				data.at[i+2," "*33]=large[i]
-				data.at[1," "*33]="Longest Subsequence Length"
-				data.at[i+2," "*34]=count2[i]
-				data.at[1," "*34]="Count"
-			data["Longest Subsequence Length with Range"]=""
-			data[" "*37]=""	
-			data[" "*38]=""
-
-			timefromtopos=3
-			for i in range(0,8,1):
-
-				#Here we write the octant values as headings for each block in the excel sheet
-				#We also add the headings "Time", "To" and "From" to the blocks for each octant
-				data.at[timefromtopos-1,"Longest Subsequence Length with Range"]=values[i]
-				data.at[timefromtopos,"Longest Subsequence Length with Range"]="Time"
-				data.at[timefromtopos-1," "*37]=large[i]
-				data.at[timefromtopos," "*37]="From"
-				data.at[timefromtopos," "*38]="To"
-				data.at[timefromtopos-1," "*38]=count2[i]
-				
-				anotherpos=1
-				for j in range(0,lastval,1):
-					newcount=1
-					if(values[i]==data["Octant"][j]):   #this code checks the initial and final timestamp of the largest consecutive occerrence of an octant value
-						for k in range(1,large[i],1):   #it goes to the octant value, checks if the next 'n' consecutive numbers are same as the current number
-							if(large[i]<=(lastval-j)):  #where 'n' is the largest consecutive occerrence calculated previously
-								if(data["Octant"][j]==data["Octant"][j+k]):
-									newcount+=1
-					if(newcount==large[i]):
-							#writes the timestamp to the excel sheet
-							data.at[timefromtopos+anotherpos," "*37]=data["T"][j]
-							data.at[timefromtopos+anotherpos," "*38]=data["T"][j+large[i]-1]
-							anotherpos+=1  
-				timefromtopos+=2+count2[i]
-			data.at[1,"Longest Subsequence Length with Range"]="Octant"	
-			data.at[1," "*37]="Longest Subsequence Length"
-			data.at[1," "*38]="Count"
-			a=reading[0:-5]
-			writer = pd.ExcelWriter("output\\"+a+"_vel_octant_analysis_mod"+str(mod)+".xlsx") 
-			data.to_excel(writer, sheet_name='Sheet1', index=False, na_rep='NaN')
-			for column in data:
-				if (not (column in ["  ","   ","    ","     ","      ","       ","        ","         "," "*21," "*23," "*24," "*25," "*26," "*27," "*28," "*29," "*30," "*34," "*38])):
-					width = max(data[column].astype(str).map(len).max(), len(column))
-					c = data.columns.get_loc(column)
-					writer.sheets['Sheet1'].set_column(c, c, width)
-			writer.save()
-			
-			import openpyxl
-			from openpyxl.styles import PatternFill
-			from openpyxl.styles.borders import Border, Side
-			#FFFF00 hex code for yellow used in the sample output
-			a=reading[0:-5]
-			book = openpyxl.load_workbook("output\\"+a+"_vel_octant_analysis_mod"+str(mod)+".xlsx")
-			sheet = book["Sheet1"]
-			
-			'''border = Border(left=Side(style='medium'), right=Side(style='medium'), top=Side(style='medium'), bottom=Side(style='medium'))
-			sheet.cell(row=3, column=2).border = border'''
-			
-			alpha=['W','X','Y','Z','AA','AB','AC','AD']
-			for i in range(0,8,1):
-				j=2
-				while (data[" "*(i+10)][j]):
-					if(data[" "*(i+10)][j]==1):
-						fill = PatternFill(patternType='solid', fgColor='FFFF00')
-						sheet[alpha[i]+str(j+2)].fill = fill
-					j+=1
-			alpha2=["AJ","AK","AL","AM","AN","AO","AP","AQ"]		
-			for i in range(0,8,1):
-				lis=[]
-				for j in range(0,8,1):
-					lis.append(data[" "*(j+23)][i+2])	
-				maxm=max(lis)
-				for j in range(0,8,1):
-					if(data[" "*(j+23)][i+2]==maxm):
-						fill = PatternFill(patternType='solid', fgColor='FFFF00')
-						sheet[alpha2[j]+str(i+4)].fill = fill	
-
-			for k in range(0,multiply+1,1):
-				for i in range(0,8,1):   
-					lis2=[]
-					for j in range(0,8,1):
-						lis2.append(data[" "*(j+23)][16+(13*k)+i])
-					maxm2=max(lis2)
-					for j in range(0,8,1):
-						if(data[" "*(j+23)][16+(13*k)+i]==maxm2):
-							fill = PatternFill(patternType='solid', fgColor='FFFF00')
-							sheet[alpha2[j]+str(16+(13*k)+i+2)].fill = fill
-
-			
-			def cell_border(ws, cell_range):
-				rows = ws[cell_range]
-				side = Side(border_style='thin', color="FF000000")
-				rows = list(rows)    
-				for y, cells in enumerate(rows):
-					for x, cell in enumerate(cells):
-						border = Border(left=cell.border.left,right=cell.border.right,top=cell.border.top,bottom=cell.border.bottom)
-						border.left = side
-						border.right = side
-						border.top = side
-						border.bottom = side
-						cell.border = border
-			cell_border(sheet,"N3:"+"AF"+str(5+multiply))
-			cell_border(sheet,"AI3:AQ11")
-			cell_border(sheet,"AC10:AE18")
-			cell_border(sheet,"AS3:AU11")
-			lastbound=0
-			cell_border(sheet,"AW3:AY"+str(16+sum(count2)+3))
-			for k in range(0,multiply+1,1):
-				cell_border(sheet,"AI"+str(17+k*13)+":AQ"+str(17+k*13+8))
-			a=reading[0:-5]
-			book.save("output\\"+a+"_vel_octant_analysis_mod"+str(mod)+".xlsx")
+				toposition=" "*(23+j)
+				report_cell(report,fromposition,toposition,int(transitions[k,i,j]))
+				if(transitions[k,i,j]==transitions[k,i].max()):
+					highlight.add((fromposition,toposition))
+	report_cell(report,1,"Longest Subsequence Length","Octant")
+	for i in range(0,8,1):
+		report_cell(report,2+i,"Longest Subsequence Length",values[i])
+	
+	
+	##############################
+	#Longest subsequence of every octant, from the run length encoding of the octant column
+	#large[i] is the longest run of values[i], count2[i] how many runs have that length and
+	#longeststarts the start indices of those runs, octant by octant
+	with octant_stage(profile,"longest_runs"):
+		large,count2,longeststarts=octant_longest_runs(octants) if runs is None else runs
+	#code to insert the final values to the report
+	for i in range(0,8,1):
+		report_cell(report,i+2," "*33,int(large[i]))
+		report_cell(report,1," "*33,"Longest Subsequence Length")
+		report_cell(report,i+2," "*34,int(count2[i]))
+		report_cell(report,1," "*34,"Count")
+
+	timefromtopos=3
+	timestamps=data["T"].to_numpy()
+	for i in range(0,8,1):
+
+		#Here we write the octant values as headings for each block in the report
+		#We also add the headings "Time", "To" and "From" to the blocks for each octant
+		report_cell(report,timefromtopos-1,"Longest Subsequence Length with Range",values[i])
+		report_cell(report,timefromtopos,"Longest Subsequence Length with Range","Time")
+		report_cell(report,timefromtopos-1," "*37,int(large[i]))
+		report_cell(report,timefromtopos," "*37,"From")
+		report_cell(report,timefromtopos," "*38,"To")
+		report_cell(report,timefromtopos-1," "*38,int(count2[i]))
+		
+		#writes the first and last timestamp of every longest run of the octant to the report
+		anotherpos=1
+		for j in longeststarts[i]:
+			report_cell(report,timefromtopos+anotherpos," "*37,timestamps[j])
+			report_cell(report,timefromtopos+anotherpos," "*38,timestamps[j+large[i]-1])
+			anotherpos+=1  
+		timefromtopos+=2+count2[i]
+	report_cell(report,1,"Longest Subsequence Length with Range","Octant")    
+	report_cell(report,1," "*37,"Longest Subsequence Length")
+	report_cell(report,1," "*38,"Count")
+
+	#Ranges of the report which get a border, (firstrow, lastrow, firstcolumn, lastcolumn)
+	boxes=[(1,3+multiply,"Overall Octant Count"," "*19),
+		(1,9,"Overall Transition Count"," "*30),
+		(newpos,newpos+8," "*16," "*18),
+		(1,9,"Longest Subsequence Length"," "*34),
+		(1,17+int(sum(count2)),"Longest Subsequence Length with Range"," "*38)]
+	for k in range(0,multiply+1,1):
+		boxes.append((15+k*13,23+k*13,"Overall Transition Count"," "*30))
+	return report,highlight,boxes
+
+
+#Analysis of a single input file, input/<reading> is read and output/<name>_vel_octant_analysis_mod<mod>.xlsx is written
+#With a profile (see octant_profile) every stage is timed, "layout" is the rest of octant_report
+#"mod" can also be a list of mod values: the octants, the tables of all the mod values (octant_mod_tables)
+#and the longest runs are then calculated once, and the reports go to one sheet per mod value of
+#output/<name>_vel_octant_analysis_mod<mod1>_<mod2>....xlsx, or to a file per mod value with separate=True
+def octant_analysis_file(reading,mod=5000,cache=True,profile=None,separate=False):
+	a=os.path.splitext(reading)[0]
+	with octant_stage(profile,"read"):
+		data,octants=read_octant_input(os.path.join("input",reading),cache)
+	with octant_stage(profile,"columns"):
+		data=octant_columns(data,octants)
+	if(not isinstance(mod,(list,tuple))):
+		with octant_stage(profile,"layout"):
+			report,highlight,boxes=octant_report(data,mod,profile)
+		with octant_stage(profile,"writing"):
+			write_octant_workbook(os.path.join("output",a+"_vel_octant_analysis_mod"+str(mod)+".xlsx"),data,report,highlight,boxes)
+		return
+
+	mods=list(mod)
+	with octant_stage(profile,"counting"):
+		tables=octant_mod_tables(octants,mods)
+	with octant_stage(profile,"longest_runs"):
+		runs=octant_longest_runs(octants)
+	if(separate):
+		for mod in mods:
+			with octant_stage(profile,"layout"):
+				report,highlight,boxes=octant_report(data,mod,profile,tables[mod],runs)
+			with octant_stage(profile,"writing"):
+				write_octant_workbook(os.path.join("output",a+"_vel_octant_analysis_mod"+str(mod)+".xlsx"),data,report,highlight,boxes)
+		return
+	import pandas as pd
+	writer = pd.ExcelWriter(os.path.join("output",a+"_vel_octant_analysis_mod"+"_".join(str(mod) for mod in mods)+".xlsx"), engine="xlsxwriter")
+	for mod in mods:
+		with octant_stage(profile,"layout"):
+			report,highlight,boxes=octant_report(data,mod,profile,tables[mod],runs)
+		with octant_stage(profile,"writing"):
+			write_octant_sheet(writer,"Mod "+str(mod),data,report,highlight,boxes)
+	with octant_stage(profile,"writing"):
+		writer.close()
+
+
+#Sliding window analysis of a single input file, windows of "size" rows every "stride" rows
+#The counts and transitions of every window are written to output/<name>_sliding<size>_stride<stride>.csv
+def octant_sliding_file(reading,size,stride=1,cache=True):
+	data,octants=read_octant_input(os.path.join("input",reading),cache)
+	starts,counts,transitions=octant_sliding_windows(octants,size,stride)
+	a=os.path.splitext(reading)[0]
+	write_sliding_windows(os.path.join("output",a+"_sliding"+str(size)+"_stride"+str(stride)+".csv"),starts,size,len(octants),counts,transitions)
+
+
+#Runs octant_sliding_file for all the files of the input folder
+#As in octant_analysis an error is reported with its file and does not stop the other files
+def octant_sliding_analysis(size,stride=1,cache=True):
+	for reading in octant_input_files("input"):
+		start=time.perf_counter()
+		try:
+			octant_sliding_file(reading,size,stride,cache)
+		except Exception as e:
+			print("{}: {:.2f} s, FAILED ({})".format(reading,time.perf_counter()-start,type(e).__name__+": "+str(e)))
+		else:
+			print("{}: {:.2f} s".format(reading,time.perf_counter()-start))
+
+
+#Runs octant_analysis_file for one file and returns (file name, seconds taken, error message or None, profile)
+#Any error is caught here so that one bad file does not stop the other files of the batch
+#"profiling" is None or (memory, cprofile stage), see octant_profile. The profile is None when not profiling
+#and the cProfile stats of a file go to output/<name>_<stage>.prof
+def octant_analysis_timed(reading,mod=5000,cache=True,profiling=None,separate=False):
+	profile=None
+	if(profiling is not None):
+		memory,stage=profiling
+		profile=octant_profile(memory,stage,os.path.join("output",os.path.splitext(reading)[0]+"_"+str(stage)+".prof"))
+		if(memory):
+			tracemalloc.start()
+	start=time.perf_counter()
+	try:
+		octant_analysis_file(reading,mod,cache,profile,separate)
+	except Exception as e:
+		return (reading,time.perf_counter()-start,type(e).__name__+": "+str(e),profile)
+	finally:
+		if(profile is not None and memory):
+			tracemalloc.stop()
+	return (reading,time.perf_counter()-start,None,profile)
+
+
+#Help
+#With workers>1 the input files are spread over a pool of worker processes, so a batch of files
+#takes about as long as its slowest file instead of the sum of all of them
+#Every file is submitted on its own: if a worker process dies (killed when out of memory, or a crash in
+#a native reader) the files it was running, and those still waiting, are reported as failed, the files
+#already done keep their results
+#With cache=False the input files are always parsed again, see read_octant_input
+#With profiling=(memory, cprofile stage) the time (and memory) of every stage is printed for every file
+#mod can be a list of mod values, see octant_analysis_file
+def octant_analysis(mod=5000,workers=1,cache=True,profiling=None,separate=False):
+	try:
+		inputfiles=octant_input_files("input")
 	except FileNotFoundError:
 		print("Incorrect file name")  
+		return
+	if(workers>1):
+		start=time.perf_counter()
+		results={}
+		with ProcessPoolExecutor(max_workers=workers) as pool:
+			futures={pool.submit(octant_analysis_timed,reading,mod,cache,profiling,separate):reading for reading in inputfiles}
+			for future in as_completed(futures):
+				reading=futures[future]
+				try:
+					results[reading]=future.result()
+				except Exception as e:
+					results[reading]=(reading,time.perf_counter()-start,type(e).__name__+": "+str(e),None)
+		summary=[results[reading] for reading in inputfiles]
 	else:
-		pass
-		#write some code
+		summary=[octant_analysis_timed(reading,mod,cache,profiling,separate) for reading in inputfiles]
 
+	#Time taken by every file, and the error for the files which could not be processed
+	for reading,elapsed,error,profile in summary:
+		if(error is None):
+			print("{}: {:.2f} s".format(reading,elapsed))
+		else:
+			print("{}: {:.2f} s, FAILED ({})".format(reading,elapsed,error))
+		if(profile is not None):
+			print_octant_profile(profile)
+	return summary
 
-from platform import python_version
-ver = python_version()
 
-if ver == "3.8.10":
-	print("Correct Version Installed")
-else:
-	print("Please install 3.8.10. Instruction are present in the GitHub Repo/Webmail. Url: https://pastebin.com/nvibxmjw")
+if __name__ == "__main__":
+	import argparse
+	parser = argparse.ArgumentParser(description="Octant analysis of all the files in the input folder")
+	parser.add_argument("--mod", type=int, nargs="+", default=[5000], help="mod value (default 5000), several values give one sheet per mod value")
+	parser.add_argument("--separate-files", action="store_true", help="with several mod values, write a file per mod value instead of a sheet per mod value")
+	parser.add_argument("--workers", type=int, default=1, help="number of worker processes (default 1)")
+	parser.add_argument("--no-cache", action="store_true", help="always parse the input files again instead of using the cache")
+	parser.add_argument("--ingest", nargs="+", metavar="WORKBOOK", help="convert the workbooks to memory-mapped .octc files and exit")
+	parser.add_argument("--float32", action="store_true", help="store T, U, V and W as float32 when ingesting")
+	parser.add_argument("--window", type=int, metavar="SIZE", help="sliding window mode: counts and transitions of windows of SIZE rows to csv files instead of the report")
+	parser.add_argument("--stride", type=int, default=1, help="with --window, rows between the starts of the windows (default 1)")
+	parser.add_argument("--profile", action="store_true", help="print the time taken by every stage of every file")
+	parser.add_argument("--profile-memory", action="store_true", help="also trace the memory peak of every stage (slower), implies --profile")
+	parser.add_argument("--cprofile", metavar="STAGE", choices=["read","columns","counting","transitions","longest_runs","layout","writing"], help="dump the cProfile stats of one stage (all its runs) to output/<name>_<STAGE>.prof, implies --profile")
+	args = parser.parse_args()
+	if args.window is not None and (args.window<1 or args.stride<1):
+		parser.error("--window and --stride must be positive")
 
+	if args.ingest:
+		for workbook in args.ingest:
+			print("Ingested "+workbook+" to "+ingest_octant_input(workbook,dtype=np.float32 if args.float32 else np.float64))
+		raise SystemExit(0)
 
-mod=5000
-octant_analysis(mod)
+	from platform import python_version
+	ver = python_version()
+
+	if ver == "3.8.10":
+		print("Correct Version Installed")
+	else:
+		print("Please install 3.8.10. Instruction are present in the GitHub Repo/Webmail. Url: https://pastebin.com/nvibxmjw")
+
+
+	mod=args.mod[0] if len(args.mod)==1 else args.mod
+	profiling=(args.profile_memory,args.cprofile) if (args.profile or args.profile_memory or args.cprofile) else None
+	if args.window is not None:
+		octant_sliding_analysis(args.window,args.stride,not args.no_cache)
+	else:
+		octant_analysis(mod,args.workers,not args.no_cache,profiling,args.separate_files)
 
 
 
 
 
 
-#This shall be the last lines of the code.
-end_time = datetime.now()
-print('Duration of Program Execution: {}'.format(end_time - start_time))
+	#This shall be the last lines of the code.
+	end_time = datetime.now()
+	print('Duration of Program Execution: {}'.format(end_time - start_time))